@@ -5,18 +5,46 @@ Captures web-based attacks including credential stuffing, SQL injection, and XSS
 """
 
 from fastapi import FastAPI, Request, HTTPException, Form
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import datetime
+from collections import deque, OrderedDict, Counter
 import json
 import os
 import re
 import hashlib
+import gzip
+import time
+import asyncio
+import queue
+import threading
+import importlib.util
 import uvicorn
 from typing import Optional, Dict, List
 import logging
+from contextlib import asynccontextmanager
+
+# Try importing Hyperscan for SIMD multi-pattern matching
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# Try importing orjson for fast event (de)serialization
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Try importing pyahocorasick for single-pass keyword matching
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
 
 # Configure logging
 logging.basicConfig(
@@ -29,16 +57,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Enterprise Admin Portal", version="1.0.0")
 
-# Add CORS middleware to accept requests from any origin
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Replay the event log and run the writer thread once per worker process"""
+    event_stats.load(EventLogger.LOG_FILE)
+    
+    event_writer = threading.Thread(
+        target=EventLogger.run_writer, name='event-writer', daemon=True
+    )
+    event_writer.start()
+    
+    yield
+    
+    EventLogger.flush()
+
+
+app = FastAPI(title="Enterprise Admin Portal", version="1.0.0", lifespan=lifespan)
 
 
 # ============================================================================
@@ -51,16 +86,19 @@ class AttackDetector:
     Uses regex patterns to identify SQL injection, XSS, and other exploits.
     """
     
+    # These run against attacker-controlled input, so every repetition is either
+    # bounded or a negated class that cannot backtrack into itself (no ReDoS).
+    
     # SQL Injection patterns
-    SQL_PATTERNS = [
-        r"(\bunion\b.*\bselect\b)",
+    SQL_PATTERN_SOURCES = (
+        r"(\bunion\b.{0,256}\bselect\b)",
         r"(\bor\b\s+['\"]?1['\"]?\s*=\s*['\"]?1)",
         r"(\bor\b\s+['\"]?true['\"]?)",
-        r"(;.*drop\s+table)",
-        r"(;.*delete\s+from)",
-        r"(;.*insert\s+into)",
-        r"(;.*update\s+.*set)",
-        r"('|\")(\s*)(or|and)(\s*)('|\"|1|true)",
+        r"(;\s*drop\s+table)",
+        r"(;\s*delete\s+from)",
+        r"(;\s*insert\s+into)",
+        r"(;\s*update\s+\S+\s+set)",
+        r"(['\"]\s*(?:or|and)\s*(?:['\"]|1|true))",
         r"(exec\s*\()",
         r"(execute\s+immediate)",
         r"(benchmark\s*\()",
@@ -70,131 +108,237 @@ class AttackDetector:
         r"(char\s*\()",
         r"(concat\s*\()",
         r"(0x[0-9a-f]+)",  # Hex encoding
-    ]
+    )
     
     # XSS (Cross-Site Scripting) patterns
-    XSS_PATTERNS = [
-        r"(<script[^>]*>.*?</script>)",
-        r"(<script[^>]*>)",
+    XSS_PATTERN_SOURCES = (
+        r"(<script\b[^>]{0,256}>[^<]*</script>)",
+        r"(<script\b[^>]{0,256}>)",
         r"(javascript:)",
         r"(onerror\s*=)",
         r"(onload\s*=)",
         r"(onclick\s*=)",
         r"(onmouseover\s*=)",
-        r"(<iframe[^>]*>)",
-        r"(<object[^>]*>)",
-        r"(<embed[^>]*>)",
-        r"(<img[^>]*onerror)",
-        r"(<svg[^>]*onload)",
+        r"(<iframe[^>]{0,256}>)",
+        r"(<object[^>]{0,256}>)",
+        r"(<embed[^>]{0,256}>)",
+        r"(<img[^>]{0,256}onerror)",
+        r"(<svg[^>]{0,256}onload)",
         r"(eval\s*\()",
         r"(alert\s*\()",
         r"(prompt\s*\()",
         r"(confirm\s*\()",
         r"(document\.cookie)",
         r"(document\.write)",
-    ]
+    )
     
     # Path Traversal patterns
-    PATH_TRAVERSAL_PATTERNS = [
-        r"(\.\.\/|\.\.\\)",
-        r"(%2e%2e%2f|%2e%2e/|..%2f|%2e%2e%5c)",
-        r"(\/etc\/passwd)",
-        r"(\/windows\/system32)",
-    ]
+    PATH_TRAVERSAL_PATTERN_SOURCES = (
+        # Plain or URL-encoded "../" / "..\", plus well-known targets
+        r"((?:\.\.|%2e%2e)(?:[\\/]|%2f|%5c)|\/etc\/passwd|\/windows\/system32)",
+    )
     
     # Command Injection patterns
-    COMMAND_INJECTION_PATTERNS = [
-        r"(;\s*ls\s)",
-        r"(;\s*cat\s)",
-        r"(;\s*wget\s)",
-        r"(;\s*curl\s)",
-        r"(\|\s*nc\s)",
-        r"(\&\&\s*id)",
-        r"(`.*`)",
-        r"(\$\(.*\))",
-    ]
+    COMMAND_INJECTION_PATTERN_SOURCES = (
+        r"(;\s*(?:ls|cat|wget|curl)\s|\|\s*nc\s|\&\&\s*id)",
+        r"(`[^`\n]*`)",
+        r"(\$\([^)\n]{0,256}\))",
+    )
+    
+    # Compiled once at import time so each request skips the re cache lookup
+    SQL_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in SQL_PATTERN_SOURCES)
+    XSS_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in XSS_PATTERN_SOURCES)
+    PATH_TRAVERSAL_PATTERNS = tuple(
+        re.compile(p, re.IGNORECASE) for p in PATH_TRAVERSAL_PATTERN_SOURCES
+    )
+    COMMAND_INJECTION_PATTERNS = tuple(
+        re.compile(p, re.IGNORECASE) for p in COMMAND_INJECTION_PATTERN_SOURCES
+    )
+    
+    # Attack categories in reporting order
+    CATEGORIES = (
+        ('SQL_INJECTION', SQL_PATTERN_SOURCES),
+        ('XSS', XSS_PATTERN_SOURCES),
+        ('PATH_TRAVERSAL', PATH_TRAVERSAL_PATTERN_SOURCES),
+        ('COMMAND_INJECTION', COMMAND_INJECTION_PATTERN_SOURCES),
+    )
+    
+    # Every pattern fused into one alternation so a payload is scanned once.
+    # Each alternative is a named group "<CATEGORY>_<index>" identifying it.
+    COMBINED_PATTERN = re.compile(
+        "|".join(
+            f"(?P<{category}_{i}>{source})"
+            for category, sources in CATEGORIES
+            for i, source in enumerate(sources)
+        ),
+        re.IGNORECASE
+    )
+    
+    # Group name -> (category, log label)
+    PATTERN_LABELS = {
+        f"{category}_{i}": (category, f"{category}: {source}")
+        for category, sources in CATEGORIES
+        for i, source in enumerate(sources)
+    }
+    PATTERN_ORDER = {name: order for order, name in enumerate(PATTERN_LABELS)}
+    
+    # Only this many leading characters of a payload are scanned, which keeps
+    # detection cost independent of how much the client sends
+    MAX_SCAN_LENGTH = 4096
+    
+    # Hyperscan pattern id -> group name (database built at module load)
+    PATTERN_NAMES = tuple(PATTERN_LABELS)
+    HYPERSCAN_DB = None
+    
+    # Group name -> compiled pattern, for reporting every pattern that
+    # matches (the combined alternation only finds non-overlapping hits)
+    NAMED_PATTERNS = tuple(zip(
+        PATTERN_NAMES,
+        SQL_PATTERNS + XSS_PATTERNS + PATH_TRAVERSAL_PATTERNS + COMMAND_INJECTION_PATTERNS
+    ))
+    
+    @staticmethod
+    def detect_category(text: str, category: str) -> List[str]:
+        """Labels of the patterns from one attack category found in text"""
+        matched = AttackDetector.match_patterns(text)
+        return [
+            label
+            for name, (pattern_category, label) in AttackDetector.PATTERN_LABELS.items()
+            if pattern_category == category and name in matched
+        ]
     
     @staticmethod
     def detect_sql_injection(text: str) -> List[str]:
         """Detect SQL injection patterns"""
-        detected = []
-        text_lower = text.lower()
-        
-        for pattern in AttackDetector.SQL_PATTERNS:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                detected.append(f"SQL_INJECTION: {pattern}")
-        
-        return detected
+        return AttackDetector.detect_category(text, 'SQL_INJECTION')
     
     @staticmethod
     def detect_xss(text: str) -> List[str]:
         """Detect XSS patterns"""
-        detected = []
-        text_lower = text.lower()
-        
-        for pattern in AttackDetector.XSS_PATTERNS:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                detected.append(f"XSS: {pattern}")
-        
-        return detected
+        return AttackDetector.detect_category(text, 'XSS')
     
     @staticmethod
     def detect_path_traversal(text: str) -> List[str]:
         """Detect path traversal attempts"""
-        detected = []
-        
-        for pattern in AttackDetector.PATH_TRAVERSAL_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                detected.append(f"PATH_TRAVERSAL: {pattern}")
-        
-        return detected
+        return AttackDetector.detect_category(text, 'PATH_TRAVERSAL')
     
     @staticmethod
     def detect_command_injection(text: str) -> List[str]:
         """Detect command injection attempts"""
-        detected = []
+        return AttackDetector.detect_category(text, 'COMMAND_INJECTION')
+    
+    @staticmethod
+    def match_patterns(text: str) -> set:
+        """Return the group names of every pattern found in text"""
+        text = text[:AttackDetector.MAX_SCAN_LENGTH]
+        
+        if AttackDetector.HYPERSCAN_DB is not None:
+            matched = set()
+            AttackDetector.HYPERSCAN_DB.scan(
+                text.encode('utf-8', errors='ignore'),
+                match_event_handler=_collect_hyperscan_match,
+                context=matched
+            )
+            return matched
         
-        for pattern in AttackDetector.COMMAND_INJECTION_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                detected.append(f"COMMAND_INJECTION: {pattern}")
+        # Clean text (the common case) costs one pass over the combined
+        # alternation. After a hit, each pattern is searched on its own, so
+        # overlapping matches are reported just as Hyperscan reports them.
+        if AttackDetector.COMBINED_PATTERN.search(text) is None:
+            return set()
         
-        return detected
+        return {
+            name
+            for name, pattern in AttackDetector.NAMED_PATTERNS
+            if pattern.search(text)
+        }
     
     @staticmethod
-    def analyze_payload(text: str) -> Dict:
-        """Comprehensive payload analysis"""
-        results = {
+    def analyze_payload_fast(text: str) -> bool:
+        """Quick malicious check that stops at the first pattern hit"""
+        text = text[:AttackDetector.MAX_SCAN_LENGTH]
+        
+        if AttackDetector.HYPERSCAN_DB is not None:
+            try:
+                AttackDetector.HYPERSCAN_DB.scan(
+                    text.encode('utf-8', errors='ignore'),
+                    match_event_handler=_stop_on_hyperscan_match
+                )
+            except hyperscan.ScanTerminated:
+                return True
+            return False
+        
+        return AttackDetector.COMBINED_PATTERN.search(text) is not None
+    
+    @staticmethod
+    def empty_analysis() -> Dict:
+        """Analysis result for a payload with no detections"""
+        return {
             'is_malicious': False,
             'attack_types': [],
             'patterns_detected': []
         }
+    
+    @staticmethod
+    def analyze_payload(text: str) -> Dict:
+        """Comprehensive payload analysis"""
+        results = AttackDetector.empty_analysis()
         
-        # Run all detectors
-        sql_detections = AttackDetector.detect_sql_injection(text)
-        xss_detections = AttackDetector.detect_xss(text)
-        path_detections = AttackDetector.detect_path_traversal(text)
-        cmd_detections = AttackDetector.detect_command_injection(text)
-        
-        # Aggregate results
-        all_detections = sql_detections + xss_detections + path_detections + cmd_detections
+        matched = AttackDetector.match_patterns(text)
         
-        if all_detections:
+        if matched:
             results['is_malicious'] = True
-            results['patterns_detected'] = all_detections
+            
+            attack_types = set()
+            for name in sorted(matched, key=AttackDetector.PATTERN_ORDER.__getitem__):
+                category, label = AttackDetector.PATTERN_LABELS[name]
+                attack_types.add(category)
+                results['patterns_detected'].append(label)
             
             # Categorize attack types
-            if sql_detections:
-                results['attack_types'].append('SQL_INJECTION')
-            if xss_detections:
-                results['attack_types'].append('XSS')
-            if path_detections:
-                results['attack_types'].append('PATH_TRAVERSAL')
-            if cmd_detections:
-                results['attack_types'].append('COMMAND_INJECTION')
+            results['attack_types'] = [
+                category for category, _ in AttackDetector.CATEGORIES
+                if category in attack_types
+            ]
         
         return results
 
 
+def _collect_hyperscan_match(pattern_id, start, end, flags, context):
+    """Hyperscan match callback: record which pattern fired"""
+    context.add(AttackDetector.PATTERN_NAMES[pattern_id])
+
+
+def _stop_on_hyperscan_match(pattern_id, start, end, flags, context):
+    """Hyperscan match callback: halt the scan on the first hit"""
+    return True
+
+
+def _build_hyperscan_database():
+    """Compile all attack patterns into a single Hyperscan database"""
+    sources = [
+        source
+        for _, category_sources in AttackDetector.CATEGORIES
+        for source in category_sources
+    ]
+    
+    try:
+        database = hyperscan.Database()
+        database.compile(
+            expressions=[source.encode() for source in sources],
+            ids=list(range(len(sources))),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(sources)
+        )
+        return database
+    except Exception as e:
+        logger.warning(f"Hyperscan compile failed, using regex fallback: {e}")
+        return None
+
+
+if HYPERSCAN_AVAILABLE:
+    AttackDetector.HYPERSCAN_DB = _build_hyperscan_database()
+
+
 # ============================================================================
 # RATE LIMITING
 # ============================================================================
@@ -205,41 +349,64 @@ class RateLimiter:
     Detects automated attacks and brute force attempts.
     """
     
-    def __init__(self, max_requests: int = 10, window_seconds: int = 60):
+    def __init__(self, max_requests: int = 10, window_seconds: int = 60,
+                 max_tracked_ips: int = 100000, sweep_interval: int = 60):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: Dict[str, List[datetime]] = defaultdict(list)
+        self.max_tracked_ips = max_tracked_ips
+        self.sweep_interval = sweep_interval
+        # Monotonic request timestamps per IP, oldest first; the dict itself
+        # is kept in least-recently-seen order so it can be capped as an LRU
+        self.requests: Dict[str, deque] = OrderedDict()
+        self._last_sweep = time.monotonic()
+    
+    def _prune(self, ip: str, now: float) -> deque:
+        """Drop timestamps that have fallen out of the window"""
+        timestamps = self.requests.get(ip)
+        if timestamps is None:
+            timestamps = self.requests[ip] = deque()
+            if len(self.requests) > self.max_tracked_ips:
+                self.requests.popitem(last=False)  # Evict least recently seen IP
+        else:
+            self.requests.move_to_end(ip)
+        
+        cutoff = now - self.window_seconds
+        while timestamps and timestamps[0] <= cutoff:
+            timestamps.popleft()
+        return timestamps
+    
+    def _sweep(self, now: float):
+        """Forget IPs with no requests left in the window"""
+        cutoff = now - self.window_seconds
+        stale = [
+            ip for ip, timestamps in self.requests.items()
+            if not timestamps or timestamps[-1] <= cutoff
+        ]
+        for ip in stale:
+            del self.requests[ip]
     
     def is_rate_limited(self, ip: str) -> bool:
         """Check if IP has exceeded rate limit"""
-        now = datetime.now()
-        cutoff = now - timedelta(seconds=self.window_seconds)
+        now = time.monotonic()
         
-        # Clean old requests
-        self.requests[ip] = [
-            req_time for req_time in self.requests[ip]
-            if req_time > cutoff
-        ]
+        # Periodically drop idle IPs so scanners can't grow this forever
+        if now - self._last_sweep > self.sweep_interval:
+            self._sweep(now)
+            self._last_sweep = now
+        
+        timestamps = self._prune(ip, now)
         
         # Check if over limit
-        if len(self.requests[ip]) >= self.max_requests:
+        if len(timestamps) >= self.max_requests:
             return True
         
         # Add current request
-        self.requests[ip].append(now)
+        timestamps.append(now)
         return False
     
     def get_request_count(self, ip: str) -> int:
         """Get current request count for IP"""
-        now = datetime.now()
-        cutoff = now - timedelta(seconds=self.window_seconds)
-        
-        self.requests[ip] = [
-            req_time for req_time in self.requests[ip]
-            if req_time > cutoff
-        ]
-        
-        return len(self.requests[ip])
+        return len(self._prune(ip, time.monotonic()))
     
     def get_stats(self, ip: str) -> Dict:
         """Get detailed stats for an IP"""
@@ -256,17 +423,102 @@ class RateLimiter:
 # EVENT LOGGING
 # ============================================================================
 
+def dump_event(event: Dict) -> bytes:
+    """Serialize an event to a compact JSON line body"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(event)
+    return json.dumps(event, separators=(',', ':')).encode('utf-8')
+
+
+def load_event(line) -> Dict:
+    """Parse one JSON Lines record"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+class EventStatistics:
+    """
+    Running aggregate of every logged event.
+    Kept in memory so the stats endpoint needs no disk I/O or JSON parsing.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.event_types = Counter()
+        self.unique_ips = set()
+        self.malicious_attempts = 0
+        self.top_usernames = Counter()
+        self.attack_types = Counter()
+    
+    def record(self, event: Dict):
+        """Fold a single event into the counters"""
+        event_type = event['event_type']
+        data = event['data']
+        
+        with self._lock:
+            self.event_types[event_type] += 1
+            
+            if 'ip' in data:
+                self.unique_ips.add(data['ip'])
+            
+            if event_type == 'login_attempt':
+                self.top_usernames[data['username']] += 1
+                
+                if data['attack_analysis']['overall_malicious']:
+                    self.malicious_attempts += 1
+                    
+                    for field in ['username', 'password']:
+                        self.attack_types.update(
+                            data['attack_analysis'][field].get('attack_types', [])
+                        )
+    
+    def load(self, path: str):
+        """Rebuild the counters by replaying an existing JSON Lines log"""
+        if not os.path.exists(path):
+            return
+        
+        try:
+            with open(path, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        self.record(load_event(line))
+        except Exception as e:
+            logger.error(f"Failed to replay event log: {e}")
+    
+    def snapshot(self) -> Dict:
+        """Current statistics in the /stats response format"""
+        with self._lock:
+            return {
+                'total_events': sum(self.event_types.values()),
+                'event_types': dict(self.event_types),
+                'unique_ips': list(self.unique_ips)[:10],  # Limit to top 10
+                'malicious_attempts': self.malicious_attempts,
+                'top_usernames': dict(self.top_usernames.most_common(10)),
+                'attack_types': dict(self.attack_types),
+                'unique_ip_count': len(self.unique_ips)
+            }
+
+
 class EventLogger:
     """
     Handles structured logging of all honeypot events.
-    Stores data in JSON format for analysis and threat intelligence.
+    Stores data in JSON Lines format (one event per line) for analysis
+    and threat intelligence.
     """
     
-    LOG_FILE = 'honeypot_events.json'
+    LOG_FILE = 'honeypot_events.jsonl'
+    QUEUE_SIZE = 10000
+    BATCH_SIZE = 256
+    
+    # Events are handed to a background writer thread so request handlers
+    # never block the event loop on serialization or disk I/O
+    _queue = queue.Queue(maxsize=QUEUE_SIZE)
+    dropped_events = 0
     
     @staticmethod
     def log_event(event_type: str, data: Dict):
-        """Log an event to JSON file"""
+        """Queue an event for the JSON Lines log"""
         event = {
             'timestamp': datetime.now().isoformat(),
             'event_type': event_type,
@@ -274,29 +526,64 @@ class EventLogger:
         }
         
         try:
-            # Read existing events
-            events = []
-            if os.path.exists(EventLogger.LOG_FILE):
-                with open(EventLogger.LOG_FILE, 'r') as f:
-                    events = json.load(f)
-            
-            # Append new event
-            events.append(event)
-            
-            # Write back
-            with open(EventLogger.LOG_FILE, 'w') as f:
-                json.dump(events, f, indent=2)
-            
-            logger.info(f"Logged {event_type} event from {data.get('ip', 'unknown')}")
-            
+            EventLogger._queue.put_nowait(event)
+        except queue.Full:
+            EventLogger.dropped_events += 1
+            logger.error(
+                f"Event queue full, dropped {event_type} event "
+                f"({EventLogger.dropped_events} dropped so far)"
+            )
+            return
+        
+        event_stats.record(event)
+        logger.info(f"Logged {event_type} event from {data.get('ip', 'unknown')}")
+    
+    @staticmethod
+    def _write_batch(batch: List[Dict]):
+        """Append a batch of events to the log with a single write"""
+        try:
+            # Append-only: no need to read or rewrite earlier events
+            lines = b''.join(dump_event(event) + b'\n' for event in batch)
+            with open(EventLogger.LOG_FILE, 'ab') as f:
+                f.write(lines)
         except Exception as e:
             logger.error(f"Failed to log event: {e}")
     
+    @staticmethod
+    def run_writer():
+        """Background loop: drain queued events and write them in batches"""
+        while True:
+            batch = [EventLogger._queue.get()]
+            while len(batch) < EventLogger.BATCH_SIZE:
+                try:
+                    batch.append(EventLogger._queue.get_nowait())
+                except queue.Empty:
+                    break
+            EventLogger._write_batch(batch)
+    
+    @staticmethod
+    def flush():
+        """Synchronously write any events still waiting in the queue"""
+        batch = []
+        while True:
+            try:
+                batch.append(EventLogger._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            EventLogger._write_batch(batch)
+    
     @staticmethod
     def log_login_attempt(ip: str, username: str, password: str, 
                          user_agent: str, attack_analysis: Dict, 
                          rate_limit_info: Dict):
         """Log a login attempt with full context"""
+        # 128-bit BLAKE2b keeps the same hash length as the old MD5 digest
+        credential_hash = hashlib.blake2b(digest_size=16)
+        credential_hash.update(username.encode())
+        credential_hash.update(b":")
+        credential_hash.update(password.encode())
+        
         data = {
             'ip': ip,
             'username': username,
@@ -304,7 +591,7 @@ class EventLogger:
             'user_agent': user_agent,
             'attack_analysis': attack_analysis,
             'rate_limit': rate_limit_info,
-            'credential_hash': hashlib.md5(f"{username}:{password}".encode()).hexdigest()
+            'credential_hash': credential_hash.hexdigest()
         }
         EventLogger.log_event('login_attempt', data)
     
@@ -328,6 +615,9 @@ class EventLogger:
 
 rate_limiter = RateLimiter(max_requests=20, window_seconds=60)
 
+# Replayed from the event log at startup, see lifespan()
+event_stats = EventStatistics()
+
 
 # ============================================================================
 # HELPER FUNCTIONS
@@ -335,18 +625,45 @@ rate_limiter = RateLimiter(max_requests=20, window_seconds=60)
 
 def get_client_ip(request: Request) -> str:
     """Extract real client IP, handling proxies"""
-    # Check for X-Forwarded-For header (common with proxies/load balancers)
-    forwarded = request.headers.get('X-Forwarded-For')
+    headers = request.headers
+    
+    # Check for X-Forwarded-For header (common with proxies/load balancers);
+    # only the first hop is needed, so slice instead of splitting the list
+    forwarded = headers.get('x-forwarded-for')
     if forwarded:
-        return forwarded.split(',')[0].strip()
+        comma = forwarded.find(',')
+        return (forwarded[:comma] if comma >= 0 else forwarded).strip()
     
     # Check X-Real-IP header
-    real_ip = request.headers.get('X-Real-IP')
+    real_ip = headers.get('x-real-ip')
     if real_ip:
         return real_ip
     
     # Fall back to direct connection IP
-    return request.client.host if request.client else 'unknown'
+    client = request.client
+    return client.host if client else 'unknown'
+
+
+# Common attack tool user agents
+SUSPICIOUS_UA_KEYWORDS = (
+    'sqlmap', 'nikto', 'nmap', 'masscan', 'nessus',
+    'burpsuite', 'metasploit', 'havij', 'acunetix',
+    'w3af', 'webscarab', 'python-requests', 'curl',
+    'wget', 'scanner', 'bot'
+)
+_UA_KEYWORD_ORDER = {keyword: i for i, keyword in enumerate(SUSPICIOUS_UA_KEYWORDS)}
+
+
+def _build_ua_automaton():
+    """Build an Aho-Corasick automaton matching every keyword in one pass"""
+    automaton = ahocorasick.Automaton()
+    for keyword in SUSPICIOUS_UA_KEYWORDS:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+_UA_AUTOMATON = _build_ua_automaton() if AHOCORASICK_AVAILABLE else None
 
 
 def analyze_user_agent(user_agent: str) -> Dict:
@@ -357,19 +674,16 @@ def analyze_user_agent(user_agent: str) -> Dict:
         'indicators': []
     }
     
-    # Common attack tool user agents
-    suspicious_keywords = [
-        'sqlmap', 'nikto', 'nmap', 'masscan', 'nessus',
-        'burpsuite', 'metasploit', 'havij', 'acunetix',
-        'w3af', 'webscarab', 'python-requests', 'curl',
-        'wget', 'scanner', 'bot'
-    ]
-    
     ua_lower = user_agent.lower()
-    for keyword in suspicious_keywords:
-        if keyword in ua_lower:
-            analysis['is_suspicious'] = True
-            analysis['indicators'].append(f"Contains '{keyword}'")
+    if _UA_AUTOMATON is not None:
+        hits = {keyword for _, keyword in _UA_AUTOMATON.iter(ua_lower)}
+        keywords = sorted(hits, key=_UA_KEYWORD_ORDER.__getitem__)
+    else:
+        keywords = [k for k in SUSPICIOUS_UA_KEYWORDS if k in ua_lower]
+    
+    if keywords:
+        analysis['is_suspicious'] = True
+        analysis['indicators'] = [f"Contains '{keyword}'" for keyword in keywords]
     
     # Check for empty or very short user agents
     if len(user_agent) < 10:
@@ -380,13 +694,11 @@ def analyze_user_agent(user_agent: str) -> Dict:
 
 
 # ============================================================================
-# API ENDPOINTS
+# STATIC PAGES
 # ============================================================================
 
-@app.get("/", response_class=HTMLResponse)
-async def root():
-    """Serve a basic homepage"""
-    html_content = """
+# Pages never change, so encode (and gzip) them once at import time
+ROOT_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -424,24 +736,10 @@ async def root():
         </div>
     </body>
     </html>
-    """
-    return HTMLResponse(content=html_content)
+    """.encode('utf-8')
+ROOT_HTML_GZIP = gzip.compress(ROOT_HTML)
 
-
-@app.get("/admin/login", response_class=HTMLResponse)
-async def admin_login_page(request: Request):
-    """Serve realistic admin login page"""
-    ip = get_client_ip(request)
-    user_agent = request.headers.get('User-Agent', 'Unknown')
-    
-    # Log the access
-    EventLogger.log_event('page_access', {
-        'ip': ip,
-        'path': '/admin/login',
-        'user_agent': user_agent
-    })
-    
-    html_content = """
+LOGIN_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -570,8 +868,105 @@ async def admin_login_page(request: Request):
         </script>
     </body>
     </html>
+    """.encode('utf-8')
+LOGIN_HTML_GZIP = gzip.compress(LOGIN_HTML)
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
     """
-    return HTMLResponse(content=html_content)
+    Whether an Accept-Encoding header allows gzip.
+    An explicit gzip entry decides; otherwise a "*" entry does. Either only
+    counts with a non-zero q-value, so "gzip;q=0" is a refusal.
+    """
+    wildcard = None
+    for entry in accept_encoding.split(','):
+        coding, *params = entry.split(';')
+        coding = coding.strip().lower()
+        
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        
+        if coding == 'gzip':
+            return quality > 0
+        if coding == '*':
+            wildcard = quality > 0
+    
+    return bool(wildcard)
+
+
+def _html_response(request: Request, body: bytes, gzipped: bytes) -> Response:
+    """Serve a prebuilt page, gzipped when the client accepts it"""
+    headers = {'Vary': 'Accept-Encoding'}
+    if _accepts_gzip(request.headers.get('accept-encoding', '')):
+        headers['Content-Encoding'] = 'gzip'
+        return Response(content=gzipped, media_type='text/html', headers=headers)
+    return Response(content=body, media_type='text/html', headers=headers)
+
+
+# ============================================================================
+# API ENDPOINTS
+# ============================================================================
+
+MAX_BODY_SIZE = 16 * 1024
+
+
+@app.middleware("http")
+async def limit_body_size(request: Request, call_next):
+    """Reject oversized request bodies before they are read or analyzed"""
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_SIZE:
+        EventLogger.log_suspicious_request(
+            ip=get_client_ip(request),
+            path=request.url.path,
+            method=request.method,
+            user_agent=request.headers.get('User-Agent', 'Unknown'),
+            attack_analysis={'oversized_body': int(content_length)}
+        )
+        return JSONResponse(
+            {"detail": "Request entity too large"},
+            status_code=413
+        )
+    
+    return await call_next(request)
+
+
+# Add CORS middleware to accept requests from any origin. Registered after
+# limit_body_size so it wraps it and the 413 responses carry CORS headers too.
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.get("/", response_class=HTMLResponse)
+async def root(request: Request):
+    """Serve a basic homepage"""
+    return _html_response(request, ROOT_HTML, ROOT_HTML_GZIP)
+
+
+@app.get("/admin/login", response_class=HTMLResponse)
+async def admin_login_page(request: Request):
+    """Serve realistic admin login page"""
+    ip = get_client_ip(request)
+    user_agent = request.headers.get('User-Agent', 'Unknown')
+    
+    # Log the access
+    EventLogger.log_event('page_access', {
+        'ip': ip,
+        'path': '/admin/login',
+        'user_agent': user_agent
+    })
+    
+    return _html_response(request, LOGIN_HTML, LOGIN_HTML_GZIP)
 
 
 @app.post("/admin/login")
@@ -601,17 +996,21 @@ async def admin_login_post(
             detail="Too many requests. Please try again later."
         )
     
-    # Analyze payloads for attacks
-    username_analysis = AttackDetector.analyze_payload(username)
-    password_analysis = AttackDetector.analyze_payload(password)
+    # Analyze payloads for attacks (cheap first-hit check, full pattern
+    # enumeration only for fields that are actually malicious)
+    username_malicious = AttackDetector.analyze_payload_fast(username)
+    password_malicious = AttackDetector.analyze_payload_fast(password)
     
     combined_analysis = {
-        'username': username_analysis,
-        'password': password_analysis,
-        'overall_malicious': (
-            username_analysis['is_malicious'] or 
-            password_analysis['is_malicious']
-        )
+        'username': (
+            AttackDetector.analyze_payload(username) if username_malicious
+            else AttackDetector.empty_analysis()
+        ),
+        'password': (
+            AttackDetector.analyze_payload(password) if password_malicious
+            else AttackDetector.empty_analysis()
+        ),
+        'overall_malicious': username_malicious or password_malicious
     }
     
     # Analyze user agent
@@ -637,8 +1036,7 @@ async def admin_login_post(
     )
     
     # Always return realistic failure with slight delay
-    import time
-    time.sleep(1)  # Simulate database lookup
+    await asyncio.sleep(1)  # Simulate database lookup without blocking the loop
     
     # Return realistic error
     raise HTTPException(
@@ -691,54 +1089,10 @@ async def get_stats():
     Endpoint to view honeypot statistics (should be protected in production)
     """
     try:
-        if not os.path.exists(EventLogger.LOG_FILE):
+        stats = event_stats.snapshot()
+        if not stats['total_events']:
             return {"message": "No events logged yet"}
         
-        with open(EventLogger.LOG_FILE, 'r') as f:
-            events = json.load(f)
-        
-        # Calculate statistics
-        stats = {
-            'total_events': len(events),
-            'event_types': {},
-            'unique_ips': set(),
-            'malicious_attempts': 0,
-            'top_usernames': defaultdict(int),
-            'attack_types': defaultdict(int)
-        }
-        
-        for event in events:
-            event_type = event['event_type']
-            stats['event_types'][event_type] = stats['event_types'].get(event_type, 0) + 1
-            
-            data = event['data']
-            if 'ip' in data:
-                stats['unique_ips'].add(data['ip'])
-            
-            if event_type == 'login_attempt':
-                stats['top_usernames'][data['username']] += 1
-                
-                if data['attack_analysis']['overall_malicious']:
-                    stats['malicious_attempts'] += 1
-                    
-                    for field in ['username', 'password']:
-                        for attack_type in data['attack_analysis'][field].get('attack_types', []):
-                            stats['attack_types'][attack_type] += 1
-        
-        # Convert sets to lists for JSON serialization
-        stats['unique_ips'] = list(stats['unique_ips'])
-        stats['unique_ip_count'] = len(stats['unique_ips'])
-        stats['unique_ips'] = stats['unique_ips'][:10]  # Limit to top 10
-        
-        # Convert top usernames to list
-        stats['top_usernames'] = dict(
-            sorted(stats['top_usernames'].items(), 
-                   key=lambda x: x[1], 
-                   reverse=True)[:10]
-        )
-        
-        stats['attack_types'] = dict(stats['attack_types'])
-        
         return stats
         
     except Exception as e:
@@ -751,11 +1105,20 @@ async def get_stats():
 # ============================================================================
 
 if __name__ == "__main__":
+    # Rate limiting and live stats are per worker process; all workers append
+    # to the same event log
+    workers = int(os.environ.get('HONEYPOT_WORKERS', max(2, os.cpu_count() or 1)))
+    
+    # C event loop and HTTP parser when installed (uvicorn[standard])
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    
     print("=" * 60)
     print("HTTP Honeypot - Enterprise Admin Portal")
     print("=" * 60)
     print(f"Logs: {EventLogger.LOG_FILE}")
-    print(f"Rate Limit: {rate_limiter.max_requests} req/{rate_limiter.window_seconds}s")
+    print(f"Rate Limit: {rate_limiter.max_requests} req/{rate_limiter.window_seconds}s (per worker)")
+    print(f"Workers: {workers} ({loop}/{http})")
     print("\nEndpoints:")
     print("  - http://localhost:8000/admin/login (main honeypot)")
     print("  - http://localhost:8000/stats (statistics)")
@@ -763,4 +1126,17 @@ if __name__ == "__main__":
     print("\nPress Ctrl+C to stop")
     print("=" * 60)
     
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="warning")
+    # Requests are already logged by EventLogger, and get_client_ip parses
+    # X-Forwarded-For itself, so uvicorn's access log and proxy-headers
+    # middleware are pure overhead here
+    uvicorn.run(
+        "http_honeypot:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=workers,
+        loop=loop,
+        http=http,
+        log_level="warning",
+        access_log=False,
+        proxy_headers=False
+    )
@@ -5,13 +5,26 @@ Designed for security research and threat intelligence gathering
 """
 
 import socket
+import functools
+import re
 import threading
+import multiprocessing
 import paramiko
 import json
 import logging
 from datetime import datetime
 import os
 import sys
+import time
+import queue
+import atexit
+
+# Try importing orjson for fast log serialization
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Configure logging
 logging.basicConfig(
@@ -75,32 +88,60 @@ class FakeShell:
     All responses are fake - no real system commands are executed.
     """
     
+    # Fake filesystem structure for navigation; {username} is filled per user
+    _FS_TEMPLATE = {
+        '/': ('bin', 'etc', 'home', 'var', 'usr', 'tmp'),
+        '/home': ('{username}', 'admin', 'user'),
+        '/home/{username}': ('documents', 'downloads', '.bash_history', '.ssh'),
+        '/home/{username}/documents': ('passwords.txt', 'notes.txt'),
+        '/etc': ('passwd', 'shadow', 'hosts', 'ssh'),
+        '/var': ('log', 'www'),
+    }
+    
+    # Fake file contents
+    _FILES_TEMPLATE = {
+        '/etc/passwd': 'root:x:0:0:root:/root:/bin/bash\nubuntu:x:1000:1000::/home/ubuntu:/bin/bash\n',
+        '/etc/hosts': '127.0.0.1 localhost\n127.0.1.1 ubuntu-server\n',
+        '/home/{username}/.bash_history': 'ls -la\ncd documents\ncat passwords.txt\nexit\n',
+        '/home/{username}/documents/passwords.txt': 'mysql_password: notreal123\nssh_key_pass: fake_password\n',
+    }
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _layout(username):
+        """
+        Build the (filesystem, files) tables for a user once and share them
+        between sessions; they are never modified.
+        """
+        names = {'username': username}
+        filesystem = {
+            sys.intern(path.format_map(names)):
+                tuple(entry.format_map(names) for entry in entries)
+            for path, entries in FakeShell._FS_TEMPLATE.items()
+        }
+        files = {
+            sys.intern(path.format_map(names)): content
+            for path, content in FakeShell._FILES_TEMPLATE.items()
+        }
+        return filesystem, files
+    
     def __init__(self, username='root'):
         self.username = username
         self.hostname = 'ubuntu-server'
         self.cwd = '/home/' + username
         
-        # Fake filesystem structure for navigation
-        self.filesystem = {
-            '/': ['bin', 'etc', 'home', 'var', 'usr', 'tmp'],
-            '/home': [username, 'admin', 'user'],
-            f'/home/{username}': ['documents', 'downloads', '.bash_history', '.ssh'],
-            f'/home/{username}/documents': ['passwords.txt', 'notes.txt'],
-            '/etc': ['passwd', 'shadow', 'hosts', 'ssh'],
-            '/var': ['log', 'www'],
-        }
+        self.filesystem, self.files = self._layout(username)
         
-        # Fake file contents
-        self.files = {
-            '/etc/passwd': 'root:x:0:0:root:/root:/bin/bash\nubuntu:x:1000:1000::/home/ubuntu:/bin/bash\n',
-            '/etc/hosts': '127.0.0.1 localhost\n127.0.1.1 ubuntu-server\n',
-            f'/home/{username}/.bash_history': 'ls -la\ncd documents\ncat passwords.txt\nexit\n',
-            f'/home/{username}/documents/passwords.txt': 'mysql_password: notreal123\nssh_key_pass: fake_password\n',
-        }
+        self._update_prompt()
+    
+    def _update_prompt(self):
+        """Rebuild the cached prompt; only needed when cwd changes"""
+        self._prompt = f"{self.username}@{self.hostname}:{self.cwd}$ "
+        self._prompt_bytes = self._prompt.encode('utf-8')
     
     def get_prompt(self):
-        """Generate a realistic bash prompt"""
-        return f"{self.username}@{self.hostname}:{self.cwd}$ "
+        """Return the realistic bash prompt"""
+        return self._prompt
     
     def execute_command(self, cmd):
         """
@@ -112,29 +153,30 @@ class FakeShell:
         if not cmd:
             return ""
         
-        parts = cmd.split()
-        command = parts[0]
-        args = parts[1:] if len(parts) > 1 else []
+        # Split off the command name only; arguments are split on demand
+        command, *rest = cmd.split(None, 1)
+        args = rest[0].split() if rest else []
         
-        # Command implementations
-        if command == 'ls':
-            return self._cmd_ls(args)
-        elif command == 'pwd':
-            return self.cwd
-        elif command == 'whoami':
-            return self.username
-        elif command == 'cat':
-            return self._cmd_cat(args)
-        elif command == 'uname':
-            return self._cmd_uname(args)
-        elif command == 'cd':
-            return self._cmd_cd(args)
-        elif command == 'help':
-            return "Available commands: ls, pwd, whoami, cat, uname, cd, exit"
-        elif command == 'exit':
-            return None  # Signal to close session
-        else:
+        handler = self._DISPATCH.get(command)
+        if handler is None:
             return f"-bash: {command}: command not found"
+        return handler(self, args)
+    
+    def _cmd_pwd(self, args):
+        """Simulate pwd command"""
+        return self.cwd
+    
+    def _cmd_whoami(self, args):
+        """Simulate whoami command"""
+        return self.username
+    
+    def _cmd_help(self, args):
+        """List the supported commands"""
+        return "Available commands: ls, pwd, whoami, cat, uname, cd, exit"
+    
+    def _cmd_exit(self, args):
+        """Signal to close session"""
+        return None
     
     def _cmd_ls(self, args):
         """Simulate ls command"""
@@ -174,6 +216,7 @@ class FakeShell:
         """Simulate cd command (basic implementation)"""
         if not args:
             self.cwd = f'/home/{self.username}'
+            self._update_prompt()
             return ""
         
         new_path = args[0]
@@ -185,24 +228,57 @@ class FakeShell:
         # Simple validation
         if target in self.filesystem or target.startswith('/home/'):
             self.cwd = target
+            self._update_prompt()
             return ""
         else:
             return f"bash: cd: {new_path}: No such file or directory"
+    
+    # Command name -> handler, resolved with a single lookup
+    _DISPATCH = {
+        'ls': _cmd_ls,
+        'pwd': _cmd_pwd,
+        'whoami': _cmd_whoami,
+        'cat': _cmd_cat,
+        'uname': _cmd_uname,
+        'cd': _cmd_cd,
+        'help': _cmd_help,
+        'exit': _cmd_exit,
+    }
+
+
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+
+def _write_all(fd, data):
+    """os.write until every byte is written"""
+    while data:
+        data = data[os.write(fd, data):]
 
 
 class SessionLogger:
     """
     Handles all logging operations for the honeypot.
-    Stores data in JSON format for easy analysis.
+    Stores data in JSON Lines format (one entry per line) for easy analysis.
     """
     
-    LOG_FILE = 'honeypot_sessions.json'
+    LOG_FILE = 'honeypot_sessions.jsonl'
+    FLUSH_INTERVAL = 0.05  # seconds
+    FLUSH_BYTES = 64 * 1024
+    
+    # Connection threads only enqueue; a single flusher thread per process
+    # batches entries into one append per FLUSH_INTERVAL / FLUSH_BYTES.
+    # Worker processes each append to the same O_APPEND file.
+    _queue = queue.Queue()
+    _flusher_pid = None
     
     @staticmethod
     def log_auth(ip, username, password):
         """Log authentication attempts"""
         data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': datetime.now(),
             'type': 'authentication',
             'ip': ip,
             'username': username,
@@ -214,7 +290,7 @@ class SessionLogger:
     def log_session(ip, username, commands, duration):
         """Log complete session information"""
         data = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': datetime.now(),
             'type': 'session',
             'ip': ip,
             'username': username,
@@ -223,29 +299,152 @@ class SessionLogger:
         }
         SessionLogger._write_log(data)
     
+    @staticmethod
+    def _serialize(data):
+        """Encode a log entry as a JSON line body (datetimes as ISO 8601)"""
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(data)
+        return json.dumps(data, default=datetime.isoformat).encode('utf-8')
+    
     @staticmethod
     def _write_log(data):
-        """Append log entry to JSON file"""
+        """Queue a log entry for the flusher thread"""
         try:
-            # Read existing logs
-            if os.path.exists(SessionLogger.LOG_FILE):
-                with open(SessionLogger.LOG_FILE, 'r') as f:
-                    logs = json.load(f)
+            SessionLogger._queue.put(SessionLogger._serialize(data))
+        except Exception as e:
+            logger.error(f"Failed to write log: {e}")
+    
+    @staticmethod
+    def _append(fd, batch):
+        """
+        Append a batch of encoded entries and sync it to disk.
+        Uses one gather-write (writev) per IOV_MAX records instead of
+        joining them into a new buffer first, then a single fdatasync.
+        """
+        try:
+            if hasattr(os, 'writev'):
+                iov = []
+                for record in batch:
+                    iov.append(record)
+                    iov.append(b"\n")
+                
+                for start in range(0, len(iov), IOV_MAX):
+                    chunk = iov[start:start + IOV_MAX]
+                    written = os.writev(fd, chunk)
+                    if written < sum(map(len, chunk)):
+                        _write_all(fd, b"".join(chunk)[written:])
             else:
-                logs = []
-            
-            # Append new log
-            logs.append(data)
+                _write_all(fd, b"\n".join(batch) + b"\n")
             
-            # Write back
-            with open(SessionLogger.LOG_FILE, 'w') as f:
-                json.dump(logs, f, indent=2)
-                
+            if hasattr(os, 'fdatasync'):
+                os.fdatasync(fd)
         except Exception as e:
             logger.error(f"Failed to write log: {e}")
+    
+    @staticmethod
+    def _open_log():
+        return os.open(
+            SessionLogger.LOG_FILE,
+            os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+            0o644
+        )
+    
+    @staticmethod
+    def start_flusher():
+        """
+        Start the flusher thread for the current process.
+        Threads do not survive fork(), so worker processes call this again;
+        the copied queue is replaced since the parent still owns its entries.
+        """
+        if SessionLogger._flusher_pid == os.getpid():
+            return
+        SessionLogger._flusher_pid = os.getpid()
+        SessionLogger._queue = queue.Queue()
+        threading.Thread(
+            target=SessionLogger.run_flusher, name='session-log-flusher', daemon=True
+        ).start()
+    
+    @staticmethod
+    def run_flusher():
+        """Background loop: batch queued entries and append them to the log"""
+        try:
+            fd = SessionLogger._open_log()
+        except OSError as e:
+            logger.error(f"Failed to open log file: {e}")
+            return
+        
+        while True:
+            record = SessionLogger._queue.get()
+            batch = [record]
+            size = len(record)
+            deadline = time.monotonic() + SessionLogger.FLUSH_INTERVAL
+            
+            while size < SessionLogger.FLUSH_BYTES:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = SessionLogger._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(record)
+                size += len(record)
+            
+            SessionLogger._append(fd, batch)
+    
+    @staticmethod
+    def flush():
+        """Synchronously write any entries still waiting in the queue"""
+        batch = []
+        while True:
+            try:
+                batch.append(SessionLogger._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return
+        
+        try:
+            fd = SessionLogger._open_log()
+        except OSError as e:
+            logger.error(f"Failed to open log file: {e}")
+            return
+        try:
+            SessionLogger._append(fd, batch)
+        finally:
+            os.close(fd)
+
+
+SessionLogger.start_flusher()
+atexit.register(SessionLogger.flush)
+
+
+HOST_KEY_FILE = 'honeypot_host_key'
 
+# Bytes that end a run of echoed input: Enter, Backspace, Ctrl+C
+CONTROL_BYTES = re.compile(b'[\r\n\x7f\x03]')
 
-def handle_client(client_socket, client_addr):
+# paramiko runs a thread per Transport, so concurrency is capped rather than
+# multiplexed: idle sessions time out and connections beyond the cap are dropped
+MAX_SESSIONS = int(os.environ.get('HONEYPOT_MAX_SESSIONS', 256))
+IDLE_TIMEOUT = 300  # seconds
+
+
+def load_host_key(path=HOST_KEY_FILE):
+    """
+    Load the server host key, generating and saving it on first run.
+    Key generation is expensive, so it happens once rather than per connection.
+    """
+    if os.path.exists(path):
+        return paramiko.RSAKey(filename=path)
+    
+    host_key = paramiko.RSAKey.generate(2048)
+    host_key.write_private_key_file(path)
+    logger.info(f"Generated new host key: {path}")
+    return host_key
+
+
+def handle_client(client_socket, client_addr, host_key):
     """
     Handle individual SSH client connections.
     Manages the complete lifecycle of a honeypot session.
@@ -256,9 +455,6 @@ def handle_client(client_socket, client_addr):
     try:
         # Create SSH transport
         transport = paramiko.Transport(client_socket)
-        
-        # Generate host key (in production, load from file)
-        host_key = paramiko.RSAKey.generate(2048)
         transport.add_server_key(host_key)
         
         # Start SSH server
@@ -272,54 +468,76 @@ def handle_client(client_socket, client_addr):
             return
         
         # Send welcome banner
-        channel.send("Welcome to Ubuntu 22.04.1 LTS\r\n\r\n")
+        channel.sendall(b"Welcome to Ubuntu 22.04.1 LTS\r\n\r\n")
         
         # Initialize fake shell
         shell = FakeShell(server.username)
-        channel.send(shell.get_prompt())
+        channel.sendall(shell._prompt_bytes)
         
         # Track session
         commands = []
         start_time = datetime.now()
-        buffer = ""
+        buffer = bytearray()
         
-        # Main interaction loop
-        while True:
-            if channel.recv_ready():
-                data = channel.recv(1024).decode('utf-8', errors='ignore')
+        # Main interaction loop: block until the client sends data
+        channel.settimeout(IDLE_TIMEOUT)
+        session_open = True
+        while session_open:
+            try:
+                data = channel.recv(1024)
+            except socket.timeout:
+                logger.info(f"Idle timeout for {ip}")
+                break
+            if not data:  # EOF - client disconnected
+                break
+            
+            # Echo runs of ordinary bytes in one write; stop only at control
+            # bytes. sendall, since a channel send may write only part of
+            # the buffer.
+            pos = 0
+            while pos < len(data):
+                match = CONTROL_BYTES.search(data, pos)
+                end = match.start() if match else len(data)
+                if end > pos:
+                    buffer += data[pos:end]
+                    channel.sendall(data[pos:end])
+                if match is None:
+                    break
                 
-                for char in data:
-                    if char == '\r' or char == '\n':
-                        if buffer.strip():
-                            # Execute command
-                            result = shell.execute_command(buffer)
-                            commands.append(buffer.strip())
-                            
-                            if result is None:  # exit command
-                                channel.send("\r\nLogout\r\n")
-                                channel.close()
-                                break
-                            
-                            if result:
-                                channel.send(f"\r\n{result}\r\n")
-                            channel.send(shell.get_prompt())
-                            buffer = ""
-                        else:
-                            channel.send(shell.get_prompt())
-                    elif char == '\x7f':  # Backspace
-                        if buffer:
-                            buffer = buffer[:-1]
-                            channel.send('\b \b')
-                    elif char == '\x03':  # Ctrl+C
-                        channel.send("^C\r\n")
-                        channel.send(shell.get_prompt())
-                        buffer = ""
+                control = data[end]
+                pos = end + 1
+                
+                if control in b'\r\n':
+                    line = buffer.decode('utf-8', errors='ignore')
+                    if line.strip():
+                        # Execute command
+                        result = shell.execute_command(line)
+                        commands.append(line.strip())
+                        
+                        if result is None:  # exit command
+                            channel.sendall(b"\r\nLogout\r\n")
+                            channel.close()
+                            session_open = False
+                            break
+                        
+                        if result:
+                            channel.sendall(f"\r\n{result}\r\n".encode('utf-8'))
+                        channel.sendall(shell._prompt_bytes)
+                        buffer.clear()
                     else:
-                        buffer += char
-                        channel.send(char)
-            
-            if not channel.active:
-                break
+                        channel.sendall(shell._prompt_bytes)
+                elif control == 0x7f:  # Backspace
+                    if buffer:
+                        # Drop the whole last UTF-8 character
+                        cut = len(buffer) - 1
+                        while cut > 0 and buffer[cut] & 0xC0 == 0x80:
+                            cut -= 1
+                        del buffer[cut:]
+                        channel.sendall(b'\b \b')
+                else:  # Ctrl+C
+                    channel.sendall(b"^C\r\n")
+                    channel.sendall(shell._prompt_bytes)
+                    buffer.clear()
         
         # Log session
         duration = (datetime.now() - start_time).total_seconds()
@@ -335,29 +553,50 @@ def handle_client(client_socket, client_addr):
             pass
 
 
-def start_honeypot(host='0.0.0.0', port=2222):
+def _run_session(session_slots, client_socket, client_addr, host_key):
+    """Run a client session and free its slot when it ends"""
+    try:
+        handle_client(client_socket, client_addr, host_key)
+    finally:
+        session_slots.release()
+
+
+def start_honeypot(host='0.0.0.0', port=2222, reuse_port=False, banner=True):
     """
     Start the SSH honeypot server.
-    Listens for connections and spawns handler threads.
+    Listens for connections and spawns handler threads,
+    up to MAX_SESSIONS concurrent sessions.
+    With reuse_port, several processes can listen on the same port.
     """
+    host_key = load_host_key()
+    session_slots = threading.BoundedSemaphore(MAX_SESSIONS)
+    
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
     
     try:
         server_socket.bind((host, port))
         server_socket.listen(100)
-        logger.info(f"SSH Honeypot listening on {host}:{port}")
-        print(f"[+] Honeypot started on port {port}")
-        print(f"[+] Logs will be saved to {SessionLogger.LOG_FILE}")
-        print("[+] Press Ctrl+C to stop\n")
+        logger.info(f"SSH Honeypot listening on {host}:{port} (pid {os.getpid()})")
+        if banner:
+            print(f"[+] Honeypot started on port {port}")
+            print(f"[+] Logs will be saved to {SessionLogger.LOG_FILE}")
+            print("[+] Press Ctrl+C to stop\n")
         
         while True:
             client_socket, client_addr = server_socket.accept()
             
+            if not session_slots.acquire(blocking=False):
+                logger.warning(f"Session limit reached, dropping {client_addr[0]}")
+                client_socket.close()
+                continue
+            
             # Handle each client in a separate thread
             client_thread = threading.Thread(
-                target=handle_client,
-                args=(client_socket, client_addr)
+                target=_run_session,
+                args=(session_slots, client_socket, client_addr, host_key)
             )
             client_thread.daemon = True
             client_thread.start()
@@ -371,10 +610,54 @@ def start_honeypot(host='0.0.0.0', port=2222):
         logger.info("Honeypot stopped")
 
 
+def _worker(host, port):
+    """Worker process entry point: serve on a shared SO_REUSEPORT socket"""
+    SessionLogger.start_flusher()
+    try:
+        start_honeypot(host, port, reuse_port=True, banner=False)
+    finally:
+        # multiprocessing exits workers without running atexit handlers
+        SessionLogger.flush()
+
+
+def run_workers(host='0.0.0.0', port=2222, workers=None):
+    """
+    Run the honeypot in several processes so accepts and handshakes
+    use every core; the kernel spreads connections across the workers.
+    """
+    if workers is None:
+        workers = int(os.environ.get('HONEYPOT_WORKERS', os.cpu_count() or 1))
+    if workers <= 1 or not hasattr(socket, 'SO_REUSEPORT'):
+        start_honeypot(host, port)
+        return
+    
+    # Create the host key once so every worker serves the same one
+    load_host_key()
+    
+    processes = [
+        multiprocessing.Process(target=_worker, args=(host, port), daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    
+    print(f"[+] Honeypot started on port {port} ({workers} workers)")
+    print(f"[+] Logs will be saved to {SessionLogger.LOG_FILE}")
+    print("[+] Press Ctrl+C to stop\n")
+    
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("\n[!] Shutting down honeypot...")
+        for process in processes:
+            process.join(timeout=5)
+
+
 if __name__ == '__main__':
     # Ensure we're not running as root (security best practice)
     if os.geteuid() == 0:
         print("[!] WARNING: Running as root is not recommended")
         print("[!] Consider using a non-privileged user")
     
-    start_honeypot()
+    run_workers()
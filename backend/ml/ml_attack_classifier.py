@@ -4,20 +4,23 @@ Machine Learning Pipeline for Cyber Attack Classification
 Combines supervised and unsupervised learning for comprehensive threat detection
 """
 
+import math
+import re
 import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier, IsolationForest
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import (
-    classification_report, confusion_matrix, 
-    roc_auc_score, precision_recall_curve
+    classification_report, roc_auc_score, precision_recall_curve
 )
 import joblib
 import json
-import math
-from datetime import datetime, timedelta
-from collections import Counter
+import os
+import hashlib
+from datetime import datetime
+from collections import Counter, OrderedDict
+from operator import itemgetter
 from typing import Dict, List, Tuple, Optional
 import warnings
 warnings.filterwarnings('ignore')
@@ -30,6 +33,71 @@ except ImportError:
     SHAP_AVAILABLE = False
     print("[WARNING] SHAP not installed. Run: pip install shap")
 
+# Try importing ONNX conversion/runtime for fast Random Forest inference
+try:
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+    SKL2ONNX_AVAILABLE = True
+except ImportError:
+    SKL2ONNX_AVAILABLE = False
+
+try:
+    import onnxruntime
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+# Try importing LightGBM for histogram-based random forests
+try:
+    import lightgbm as lgb
+    LIGHTGBM_AVAILABLE = True
+except ImportError:
+    LIGHTGBM_AVAILABLE = False
+
+# Try importing Hyperscan for single-pass signature scanning
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# Try importing Numba for compiled entropy kernels
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# ============================================================================
+# COMPILED KERNELS (optional, used when Numba is installed)
+# ============================================================================
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _entropy_u8(data):
+        """Shannon entropy of a uint8 array: one counting loop, one reduction"""
+        counts = np.zeros(256, dtype=np.uint32)
+        for byte in data:
+            counts[byte] += 1
+        
+        length = data.size
+        entropy = 0.0
+        for count in counts:
+            if count:
+                p = count / length
+                entropy -= p * np.log2(p)
+        return entropy
+    
+    @njit(cache=True, fastmath=True, parallel=True)
+    def _entropy_u8_batch(data, offsets):
+        """Entropy of each data[offsets[i]:offsets[i + 1]] slice"""
+        n = offsets.size - 1
+        result = np.zeros(n)
+        for i in prange(n):
+            result[i] = _entropy_u8(data[offsets[i]:offsets[i + 1]])
+        return result
+
 
 # ============================================================================
 # FEATURE EXTRACTION ENGINE
@@ -41,8 +109,65 @@ class FeatureExtractor:
     Converts log data into ML-ready feature vectors.
     """
     
+    # Feature vector layout produced by extract_features
+    COLUMNS = (
+        'login_failures', 'consecutive_failures',
+        'command_entropy', 'command_length',
+        'mean_interval', 'std_interval', 'min_interval', 'max_interval',
+        'interval_regularity',
+        'payload_length', 'payload_entropy', 'special_char_ratio',
+        'digit_ratio', 'uppercase_ratio',
+        'user_agent_rarity',
+        'total_requests', 'unique_commands', 'session_duration',
+        'sql_signatures', 'xss_signatures',
+    )
+    INTERVAL_COLUMNS = COLUMNS[4:9]
+    PAYLOAD_COLUMNS = COLUMNS[9:14]
+    SIGNATURE_COLUMNS = COLUMNS[18:20]
+    
+    # Attack signatures searched for in payloads, one group per
+    # SIGNATURE_COLUMNS entry. None of them can match across a NUL byte.
+    SIGNATURE_CLASSES = (
+        (r"union\s+select", r"drop\s+table", r"or\s+'?1'?\s*=\s*'?1"),
+        (r"<script", r"onerror\s*=", r"javascript:"),
+    )
+    SIGNATURE_SOURCES = tuple(source for sources in SIGNATURE_CLASSES for source in sources)
+    SIGNATURE_CLASS_INDEX = np.array([
+        j for j, sources in enumerate(SIGNATURE_CLASSES) for _ in sources
+    ])
+    
+    # Compiled once at import time, for the regex fallback
+    SIGNATURE_PATTERNS = tuple(
+        re.compile(source, re.IGNORECASE) for source in SIGNATURE_SOURCES
+    )
+    
+    # Hyperscan database of SIGNATURE_SOURCES (built at module load)
+    SIGNATURE_DB = None
+    
+    # Byte class lookup table, one bit per class (ASCII, as str.isdigit()
+    # / isupper() / isalnum() / isspace() classify it)
+    DIGIT, UPPER, ALNUM, SPACE = 1, 2, 4, 8
+    BYTE_CLASSES = np.zeros(256, dtype=np.uint8)
+    BYTE_CLASSES[0x30:0x3A] = DIGIT | ALNUM
+    BYTE_CLASSES[0x41:0x5B] = UPPER | ALNUM
+    BYTE_CLASSES[0x61:0x7B] = ALNUM
+    BYTE_CLASSES[[0x09, 0x0A, 0x0B, 0x0C, 0x0D, 0x1C, 0x1D, 0x1E, 0x1F, 0x20]] = SPACE
+    
+    # (256, 4) 0/1 matrix: histogram @ BYTE_CLASS_MATRIX gives the digit,
+    # uppercase, alphanumeric and whitespace counts in one product
+    BYTE_CLASS_MATRIX = ((BYTE_CLASSES[:, None] >> np.arange(4)) & 1).astype(np.int64)
+    
+    # c * log2(c) for every byte count up to ENTROPY_TABLE_SIZE. Entropy of a
+    # histogram of N bytes is then log2(N) - sum(table[counts]) / N: one
+    # gather and one sum, with no masking or per-call log2 temporaries.
+    ENTROPY_TABLE_SIZE = 4096
+    COUNT_LOG2_COUNT = np.arange(ENTROPY_TABLE_SIZE + 1) * np.log2(
+        np.maximum(np.arange(ENTROPY_TABLE_SIZE + 1), 1)
+    )
+    
     def __init__(self):
-        self.user_agent_frequencies = {}
+        self.user_agent_frequencies = Counter()
+        self.ua_total = 0
         self.baseline_intervals = []
         
     def calculate_entropy(self, text: str) -> float:
@@ -59,17 +184,71 @@ class FeatureExtractor:
         if not text:
             return 0.0
         
-        # Count character frequencies
-        char_counts = Counter(text)
-        length = len(text)
-        
-        # Calculate Shannon entropy
-        entropy = 0.0
-        for count in char_counts.values():
-            probability = count / length
-            entropy -= probability * math.log2(probability)
+        data = np.frombuffer(text.encode('utf-8', 'replace'), dtype=np.uint8)
+        if NUMBA_AVAILABLE:
+            return float(_entropy_u8(data))
+        return self._entropy_from_counts(np.bincount(data, minlength=256), data.size)
+    
+    @staticmethod
+    def _byte_counts(text: str) -> np.ndarray:
+        """Histogram of the UTF-8 bytes of a string (256 bins)"""
+        data = np.frombuffer(text.encode('utf-8', 'replace'), dtype=np.uint8)
+        return np.bincount(data, minlength=256)
+    
+    @classmethod
+    def _entropy_from_counts(cls, counts: np.ndarray, length: int) -> float:
+        """Shannon entropy of a byte histogram holding length bytes"""
+        if length <= cls.ENTROPY_TABLE_SIZE:
+            return float(math.log2(length) - cls.COUNT_LOG2_COUNT[counts].sum() / length)
+        
+        counts = counts[counts > 0]
+        probabilities = counts / length
+        return float(-(probabilities * np.log2(probabilities)).sum())
+    
+    def calculate_entropy_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        Calculate Shannon entropy for many strings at once.
         
-        return entropy
+        Args:
+            texts: Input strings
+            
+        Returns:
+            Array of entropy values, one per input (0.0 for empty strings)
+        """
+        if NUMBA_AVAILABLE:
+            encoded = [text.encode('utf-8', 'replace') for text in texts]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+            data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+            return _entropy_u8_batch(data, offsets)
+        
+        counts, lengths = self._byte_counts_batch(texts)
+        return self._entropy_from_counts_batch(counts, lengths)
+    
+    @staticmethod
+    def _byte_counts_batch(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(n, 256) byte histograms and byte lengths for a list of strings"""
+        n = len(texts)
+        encoded = [text.encode('utf-8', 'replace') for text in texts]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=n)
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        
+        # One (n, 256) histogram: offset each byte by its row's slot
+        rows = np.repeat(np.arange(n, dtype=np.int64), lengths)
+        counts = np.bincount(rows * 256 + data, minlength=n * 256).reshape(n, 256)
+        return counts, lengths
+    
+    @classmethod
+    def _entropy_from_counts_batch(cls, counts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """Row-wise Shannon entropy of (n, 256) byte histograms"""
+        safe_lengths = np.maximum(lengths, 1)
+        if lengths.size and lengths.max() > cls.ENTROPY_TABLE_SIZE:
+            probabilities = counts / safe_lengths[:, None]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                terms = np.where(probabilities > 0, probabilities * np.log2(probabilities), 0.0)
+            return -terms.sum(axis=1)
+        
+        return np.log2(safe_lengths) - cls.COUNT_LOG2_COUNT[counts].sum(axis=1) / safe_lengths
     
     def calculate_command_entropy(self, command: str) -> float:
         """
@@ -94,26 +273,103 @@ class FeatureExtractor:
                 'uppercase_ratio': 0.0
             }
         
-        length = len(payload)
-        special_chars = sum(1 for c in payload if not c.isalnum() and not c.isspace())
-        digits = sum(1 for c in payload if c.isdigit())
-        uppercase = sum(1 for c in payload if c.isupper())
+        # One pass over the bytes feeds every feature
+        counts = self._byte_counts(payload)
+        length = int(counts.sum())
+        
+        digits, uppercase, alnum, whitespace = (counts @ self.BYTE_CLASS_MATRIX).tolist()
+        special_chars = length - alnum - whitespace
         
         return {
             'payload_length': length,
-            'payload_entropy': self.calculate_entropy(payload),
-            'special_char_ratio': special_chars / length if length > 0 else 0,
-            'digit_ratio': digits / length if length > 0 else 0,
-            'uppercase_ratio': uppercase / length if length > 0 else 0
+            'payload_entropy': self._entropy_from_counts(counts, length),
+            'special_char_ratio': special_chars / length,
+            'digit_ratio': digits / length,
+            'uppercase_ratio': uppercase / length
         }
     
+    def calculate_payload_features_batch(self, payloads: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Extract payload features for many payloads at once.
+        
+        Returns:
+            Dictionary of feature name -> array, one value per payload
+        """
+        counts, lengths = self._byte_counts_batch(payloads)
+        safe_lengths = np.maximum(lengths, 1)
+        
+        digits, uppercase, alnum, whitespace = (counts @ self.BYTE_CLASS_MATRIX).T
+        special_chars = lengths - alnum - whitespace
+        
+        return {
+            'payload_length': lengths,
+            'payload_entropy': self._entropy_from_counts_batch(counts, lengths),
+            'special_char_ratio': special_chars / safe_lengths,
+            'digit_ratio': digits / safe_lengths,
+            'uppercase_ratio': uppercase / safe_lengths
+        }
+    
+    def calculate_signature_features_batch(self, payloads: List[str]) -> np.ndarray:
+        """
+        Count the distinct attack signatures of each class in each payload.
+        
+        The payloads are joined with NUL separators and scanned in a single
+        Hyperscan pass when available, else one regex pass per signature;
+        each hit is mapped back to its payload through the start offsets.
+        Either way a signature counts at most once per payload, so both
+        backends produce the same features.
+        
+        Args:
+            payloads: Payload strings
+            
+        Returns:
+            (n, 2) array laid out as SIGNATURE_COLUMNS
+        """
+        result = np.zeros((len(payloads), len(self.SIGNATURE_COLUMNS)))
+        
+        if self.SIGNATURE_DB is not None:
+            texts = [payload.encode('utf-8', errors='ignore') for payload in payloads]
+            hits = []
+            self.SIGNATURE_DB.scan(
+                b'\x00'.join(texts),
+                match_event_handler=_collect_signature_match,
+                context=hits
+            )
+        else:
+            texts = payloads
+            joined = '\x00'.join(texts)
+            hits = [
+                (i, match.end())
+                for i, pattern in enumerate(self.SIGNATURE_PATTERNS)
+                for match in pattern.finditer(joined)
+            ]
+        
+        if not hits:
+            return result
+        
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        starts = np.cumsum(lengths + 1) - lengths - 1
+        ids, ends = np.array(hits, dtype=np.int64).T
+        rows = np.searchsorted(starts, ends - 1, side='right') - 1
+        
+        # Each (payload, signature) pair counts once
+        n_signatures = len(self.SIGNATURE_SOURCES)
+        pairs = np.unique(rows * n_signatures + ids)
+        np.add.at(
+            result,
+            (pairs // n_signatures, self.SIGNATURE_CLASS_INDEX[pairs % n_signatures]),
+            1
+        )
+        return result
+    
     def calculate_request_interval_features(self, 
                                            timestamps: List[datetime]) -> Dict[str, float]:
         """
         Analyze timing patterns in request sequences.
         
         Args:
-            timestamps: List of request timestamps
+            timestamps: Request timestamps (datetime64 array, or a list of
+                datetimes or ISO strings)
             
         Returns:
             Statistical features about request intervals
@@ -128,16 +384,21 @@ class FeatureExtractor:
             }
         
         # Calculate intervals in seconds
-        intervals = []
-        for i in range(1, len(timestamps)):
-            interval = (timestamps[i] - timestamps[i-1]).total_seconds()
-            intervals.append(interval)
-        
-        intervals = np.array(intervals)
+        if isinstance(timestamps, np.ndarray) and timestamps.dtype.kind == 'M':
+            ts64 = timestamps.astype('datetime64[us]', copy=False)
+        elif isinstance(timestamps[0], str):
+            # Normalized to UTC, so offsets may differ within a session
+            # (e.g. across a DST change); naive strings are taken as UTC
+            ts64 = pd.to_datetime(
+                timestamps, format='ISO8601', utc=True
+            ).values.astype('datetime64[us]')
+        else:
+            ts64 = np.array(timestamps, dtype='datetime64[us]')
+        intervals = np.diff(ts64).astype(np.int64) / 1e6
         
         # Calculate regularity (inverse of coefficient of variation)
-        mean_interval = np.mean(intervals)
-        std_interval = np.std(intervals)
+        mean_interval = intervals.mean()
+        std_interval = intervals.std()
         
         regularity = 0.0
         if mean_interval > 0:
@@ -147,98 +408,274 @@ class FeatureExtractor:
         return {
             'mean_interval': mean_interval,
             'std_interval': std_interval,
-            'min_interval': np.min(intervals),
-            'max_interval': np.max(intervals),
+            'min_interval': intervals.min(),
+            'max_interval': intervals.max(),
             'interval_regularity': regularity
         }
     
+    def calculate_request_interval_features_batch(self, 
+                                                 timestamp_lists: List[List]) -> np.ndarray:
+        """
+        Interval features for many timestamp sequences at once.
+        
+        All timestamps are joined into one datetime64 array - concatenated
+        when every sequence already is one, else parsed in a single
+        pd.to_datetime call - and the per-sequence statistics are segmented
+        reductions over one array of intervals.
+        
+        Args:
+            timestamp_lists: One timestamp sequence per event (datetime64
+                array, or a list of datetimes or ISO strings)
+            
+        Returns:
+            (n, 5) array laid out as INTERVAL_COLUMNS; zeros for sequences
+            with fewer than two timestamps
+        """
+        result = np.zeros((len(timestamp_lists), len(self.INTERVAL_COLUMNS)))
+        
+        rows = [i for i, ts in enumerate(timestamp_lists) if len(ts) > 1]
+        if not rows:
+            return result
+        
+        sequences = [timestamp_lists[i] for i in rows]
+        lengths = np.fromiter(map(len, sequences), dtype=np.int64, count=len(sequences))
+        if all(isinstance(ts, np.ndarray) and ts.dtype.kind == 'M' for ts in sequences):
+            ts64 = np.concatenate(sequences).astype('datetime64[us]', copy=False)
+        else:
+            flat = [ts for sequence in sequences
+                    for ts in (sequence.tolist() if isinstance(sequence, np.ndarray) else sequence)]
+            # UTC, since events from different sources carry different
+            # offsets (or none); naive values are taken as UTC
+            ts64 = pd.to_datetime(
+                flat, format='ISO8601', utc=True
+            ).values.astype('datetime64[us]')
+        
+        # Intervals in seconds, minus the ones spanning two sequences
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        keep = np.ones(ts64.size - 1, dtype=bool)
+        keep[starts[1:] - 1] = False
+        intervals = np.diff(ts64).astype(np.int64)[keep] / 1e6
+        
+        counts = lengths - 1
+        segments = starts - np.arange(len(starts))
+        
+        mean_interval = np.add.reduceat(intervals, segments) / counts
+        deviations = intervals - np.repeat(mean_interval, counts)
+        std_interval = np.sqrt(np.add.reduceat(deviations * deviations, segments) / counts)
+        
+        # Regularity (inverse of coefficient of variation)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            regularity = np.where(
+                mean_interval > 0, 1.0 / (1.0 + std_interval / mean_interval), 0.0
+            )
+        
+        result[rows] = np.column_stack((
+            mean_interval,
+            std_interval,
+            np.minimum.reduceat(intervals, segments),
+            np.maximum.reduceat(intervals, segments),
+            regularity,
+        ))
+        return result
+    
     def calculate_user_agent_rarity(self, 
                                     user_agent: str, 
-                                    all_user_agents: List[str]) -> float:
+                                    all_user_agents: List[str],
+                                    update_history: bool = True) -> float:
         """
         Calculate rarity score for a user agent.
         Rare user agents may indicate automated tools.
         
+        The history is counted once on the first updating call; afterwards
+        the cached frequencies are updated incrementally with each user
+        agent seen and all_user_agents is ignored.
+        
         Args:
             user_agent: Current user agent string
             all_user_agents: Historical list of user agents
+            update_history: Count this user agent (and, on first use, the
+                history) into the cached frequencies. Scoring passes False,
+                so scoring the same event twice gives the same rarity.
             
         Returns:
             Rarity score (0.0 = common, 1.0 = very rare)
         """
-        if not all_user_agents:
-            return 0.5  # Unknown
-        
-        # Count frequencies
-        ua_counts = Counter(all_user_agents)
-        total = len(all_user_agents)
+        if not self.ua_total:
+            if not all_user_agents:
+                return 0.5  # Unknown
+            if not update_history:
+                return 1.0 - all_user_agents.count(user_agent) / len(all_user_agents)
+            self.user_agent_frequencies.update(all_user_agents)
+            self.ua_total = len(all_user_agents)
         
         # Calculate rarity (inverse frequency)
-        count = ua_counts.get(user_agent, 0)
-        frequency = count / total if total > 0 else 0
-        
-        # Convert to rarity score
+        frequency = self.user_agent_frequencies.get(user_agent, 0) / self.ua_total
         rarity = 1.0 - frequency
         
+        if update_history:
+            self.user_agent_frequencies[user_agent] += 1
+            self.ua_total += 1
+        
         return rarity
     
-    def extract_features(self, event: Dict) -> Dict[str, float]:
+    def event_user_agent_rarity(self, event: Dict, update_history: bool = True) -> float:
+        """
+        User agent rarity for an event.
+        Uses the precomputed 'user_agent_frequency' when the event carries
+        one (still counting the user agent into the cached history for later
+        events when update_history is set), otherwise the cached history
+        (see calculate_user_agent_rarity).
+        """
+        user_agent = event.get('user_agent', '')
+        
+        frequency = event.get('user_agent_frequency')
+        if frequency is not None:
+            if update_history:
+                self.user_agent_frequencies[user_agent] += 1
+                self.ua_total += 1
+            return 1.0 - frequency
+        
+        all_user_agents = event.get('all_user_agents', [user_agent])
+        return self.calculate_user_agent_rarity(user_agent, all_user_agents, update_history)
+    
+    def extract_features(self, event: Dict, update_history: bool = True) -> np.ndarray:
         """
         Extract all features from a single security event.
         
         Args:
             event: Dictionary containing event data
+            update_history: Count the event's user agent into the history
             
         Returns:
-            Feature dictionary ready for ML model
+            float32 feature vector laid out as COLUMNS
         """
-        features = {}
+        features = np.zeros(len(self.COLUMNS), dtype=np.float32)
         
         # Login failure features
-        features['login_failures'] = event.get('login_failures', 0)
-        features['consecutive_failures'] = event.get('consecutive_failures', 0)
+        features[0] = event.get('login_failures', 0)
+        features[1] = event.get('consecutive_failures', 0)
         
         # Command entropy
         command = event.get('command', '')
-        features['command_entropy'] = self.calculate_command_entropy(command)
-        features['command_length'] = len(command)
+        features[2] = self.calculate_command_entropy(command)
+        features[3] = len(command)
         
-        # Request interval features
+        # Request interval features (left at 0.0 without timestamps)
         timestamps = event.get('timestamps', [])
-        if isinstance(timestamps, list) and len(timestamps) > 0:
-            # Convert strings to datetime if needed
-            if isinstance(timestamps[0], str):
-                timestamps = [datetime.fromisoformat(ts) for ts in timestamps]
-            
+        if isinstance(timestamps, (list, np.ndarray)) and len(timestamps) > 0:
             interval_features = self.calculate_request_interval_features(timestamps)
-            features.update(interval_features)
-        else:
-            features.update({
-                'mean_interval': 0.0,
-                'std_interval': 0.0,
-                'min_interval': 0.0,
-                'max_interval': 0.0,
-                'interval_regularity': 0.0
-            })
+            features[4:9] = [interval_features[name] for name in self.INTERVAL_COLUMNS]
         
         # Payload features
         payload = event.get('payload', '')
         payload_features = self.calculate_payload_features(payload)
-        features.update(payload_features)
+        features[9:14] = [payload_features[name] for name in self.PAYLOAD_COLUMNS]
         
         # User agent rarity
-        user_agent = event.get('user_agent', '')
-        all_user_agents = event.get('all_user_agents', [user_agent])
-        features['user_agent_rarity'] = self.calculate_user_agent_rarity(
-            user_agent, all_user_agents
-        )
+        features[14] = self.event_user_agent_rarity(event, update_history)
         
         # Additional derived features
-        features['total_requests'] = event.get('total_requests', 1)
-        features['unique_commands'] = event.get('unique_commands', 1)
-        features['session_duration'] = event.get('session_duration', 0.0)
+        features[15] = event.get('total_requests', 1)
+        features[16] = event.get('unique_commands', 1)
+        features[17] = event.get('session_duration', 0.0)
+        
+        # Attack signature counts
+        features[18:20] = self.calculate_signature_features_batch([payload])[0]
         
         return features
+    
+    @staticmethod
+    def _event_column(events: List[Dict], key: str, default: float) -> np.ndarray:
+        """Gather one numeric field across events into a float32 column"""
+        return np.fromiter(
+            (event.get(key, default) for event in events),
+            dtype=np.float32, count=len(events)
+        )
+    
+    def extract_features_batch(self, 
+                               events: List[Dict], 
+                               update_history: bool = True) -> pd.DataFrame:
+        """
+        Extract features from many events into one contiguous matrix.
+        
+        Produces the same layout as extract_features, but computes the
+        string features for all events in vectorized passes.
+        
+        Args:
+            events: List of event dictionaries
+            update_history: Count the events' user agents into the history
+            
+        Returns:
+            float32 DataFrame with COLUMNS, one row per event
+        """
+        features = self._extract_stateless_features(events)
+        
+        # Rarity may depend on the incrementally updated user-agent counts,
+        # so it is computed per event, in order
+        features[:, 14] = [
+            self.event_user_agent_rarity(event, update_history) for event in events
+        ]
+        
+        return pd.DataFrame(features, columns=list(self.COLUMNS), copy=False)
+    
+    def _extract_stateless_features(self, events: List[Dict]) -> np.ndarray:
+        """Feature matrix for events, except user_agent_rarity (left at 0)"""
+        n = len(events)
+        features = np.zeros((n, len(self.COLUMNS)), dtype=np.float32)
+        
+        commands = [event.get('command', '') for event in events]
+        payloads = [event.get('payload', '') for event in events]
+        
+        features[:, 0] = self._event_column(events, 'login_failures', 0)
+        features[:, 1] = self._event_column(events, 'consecutive_failures', 0)
+        features[:, 2] = self.calculate_entropy_batch(commands)
+        features[:, 3] = np.fromiter(map(len, commands), dtype=np.float32, count=n)
+        
+        payload_features = self.calculate_payload_features_batch(payloads)
+        for j, name in enumerate(self.PAYLOAD_COLUMNS, start=9):
+            features[:, j] = payload_features[name]
+        features[:, 18:20] = self.calculate_signature_features_batch(payloads)
+        
+        # Interval features: every event's timestamps parsed in one pass
+        timestamp_lists = []
+        for event in events:
+            timestamps = event.get('timestamps', [])
+            timestamp_lists.append(
+                timestamps if isinstance(timestamps, (list, np.ndarray)) else []
+            )
+        features[:, 4:9] = self.calculate_request_interval_features_batch(timestamp_lists)
+        
+        features[:, 15] = self._event_column(events, 'total_requests', 1)
+        features[:, 16] = self._event_column(events, 'unique_commands', 1)
+        features[:, 17] = self._event_column(events, 'session_duration', 0.0)
+        
+        return features
+
+
+def _collect_signature_match(pattern_id, start, end, flags, context):
+    """Hyperscan match callback: record (signature id, end offset)"""
+    context.append((pattern_id, end))
+
+
+def _build_signature_database():
+    """Compile all payload signatures into a single Hyperscan database"""
+    sources = FeatureExtractor.SIGNATURE_SOURCES
+    
+    try:
+        database = hyperscan.Database()
+        database.compile(
+            expressions=[source.encode() for source in sources],
+            ids=list(range(len(sources))),
+            flags=[hyperscan.HS_FLAG_CASELESS] * len(sources)
+        )
+        return database
+    except Exception as e:
+        print(f"[!] Hyperscan compile failed, using regex fallback: {e}")
+        return None
+
+
+if HYPERSCAN_AVAILABLE:
+    FeatureExtractor.SIGNATURE_DB = _build_signature_database()
 
 
 # ============================================================================
@@ -251,49 +688,93 @@ class CyberAttackClassifier:
     Combines Random Forest (supervised) and Isolation Forest (unsupervised).
     """
     
-    def __init__(self, random_state: int = 42):
+    # Below this many rows, RF inference runs the trees serially
+    SERIAL_PREDICT_MAX_ROWS = 256
+    
+    # Per-row (rf_probability, isolation_score) results kept for reuse
+    SCORE_CACHE_SIZE = 10000
+    
+    def __init__(self, 
+                 random_state: int = 42,
+                 rf_weight: float = 0.7,
+                 if_weight: float = 0.3,
+                 if_n_estimators: int = 50):
+        """
+        Args:
+            random_state: Seed for both models
+            rf_weight: Weight of the RF attack probability in threat scores
+            if_weight: Weight of the Isolation Forest anomaly score; 0 skips
+                Isolation Forest scoring entirely at prediction time
+            if_n_estimators: Isolation Forest trees; anomaly scores are
+                essentially stable from about 50 trees on
+        """
         self.random_state = random_state
+        self.rf_weight = rf_weight
+        self.if_weight = if_weight
+        self._only_rf = if_weight == 0
         self.feature_extractor = FeatureExtractor()
         self.scaler = StandardScaler()
         
-        # Supervised model for known attack patterns
-        self.rf_classifier = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=10,
-            min_samples_split=5,
-            min_samples_leaf=2,
-            random_state=random_state,
-            n_jobs=-1
-        )
+        # Supervised model for known attack patterns.
+        # LightGBM's random forest mode finds splits on feature histograms
+        # in C++; the sklearn forest is the fallback without it.
+        if LIGHTGBM_AVAILABLE:
+            self.rf_classifier = lgb.LGBMClassifier(
+                boosting_type='rf',
+                n_estimators=100,
+                max_depth=8,
+                min_child_samples=5,
+                subsample=0.8,
+                subsample_freq=1,
+                colsample_bytree=0.8,
+                random_state=random_state,
+                n_jobs=-1,
+                verbose=-1
+            )
+        else:
+            self.rf_classifier = RandomForestClassifier(
+                n_estimators=100,
+                max_depth=8,
+                min_samples_split=5,
+                min_samples_leaf=5,
+                random_state=random_state,
+                n_jobs=-1
+            )
         
         # Unsupervised model for anomaly/zero-day detection
         self.isolation_forest = IsolationForest(
-            n_estimators=100,
+            n_estimators=if_n_estimators,
+            max_samples=256,  # Bounds tree depth at log2(256) = 8
             contamination=0.1,  # Expect 10% anomalies
+            bootstrap=False,
             random_state=random_state,
             n_jobs=-1
         )
         
         self.feature_names = []
         self.is_trained = False
+        self._importances_np = None  # Set once per trained/loaded model
+        self._shap_explainer = None
+        self._ort_session = None
+        self._score_cache = OrderedDict()
+        self._iso_range = None  # IF score (min, max) of the last usable predict batch
         
-    def prepare_features(self, events: List[Dict]) -> pd.DataFrame:
+    def prepare_features(self, events: List[Dict], update_history: bool = False) -> pd.DataFrame:
         """
         Convert raw events to feature matrix.
         
         Args:
             events: List of event dictionaries
+            update_history: Count the events' user agents into the extractor's
+                history. Only training does; scoring leaves it untouched, so
+                the same event always gets the same features.
             
         Returns:
             DataFrame with extracted features
         """
-        feature_list = []
-        
-        for event in events:
-            features = self.feature_extractor.extract_features(event)
-            feature_list.append(features)
-        
-        df = pd.DataFrame(feature_list)
+        df = self.feature_extractor.extract_features_batch(
+            events, update_history=update_history
+        )
         
         # Store feature names
         if not self.feature_names:
@@ -301,10 +782,19 @@ class CyberAttackClassifier:
         
         return df
     
+    def _scale(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        Standardize features into a contiguous float32 matrix.
+        The tree models split on float32, so this is the layout they use
+        without another conversion.
+        """
+        return np.ascontiguousarray(self.scaler.transform(X), dtype=np.float32)
+    
     def train(self, 
               events: List[Dict], 
               labels: List[int],
-              validation_split: float = 0.2) -> Dict:
+              validation_split: float = 0.2,
+              verbose: bool = True) -> Dict:
         """
         Train both supervised and unsupervised models.
         
@@ -312,12 +802,13 @@ class CyberAttackClassifier:
             events: Training events
             labels: Binary labels (0=benign, 1=attack)
             validation_split: Fraction for validation
+            verbose: Print the validation and feature importance reports
             
         Returns:
             Training metrics
         """
         print("[*] Extracting features from training data...")
-        X = self.prepare_features(events)
+        X = self.prepare_features(events, update_history=True)
         y = np.array(labels)
         
         print(f"[*] Feature matrix shape: {X.shape}")
@@ -331,64 +822,107 @@ class CyberAttackClassifier:
         
         # Scale features
         print("[*] Scaling features...")
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_val_scaled = self.scaler.transform(X_val)
+        self.scaler.fit(X_train)
+        X_train_scaled = self._scale(X_train)
+        X_val_scaled = self._scale(X_val)
         
         # Train Random Forest (supervised)
         print("[*] Training Random Forest classifier...")
         self.rf_classifier.fit(X_train_scaled, y_train)
-        
-        # Train Isolation Forest (unsupervised, using all data)
+        self._importances_np = self._feature_importances()
+        self._build_shap_explainer()
+        self._ort_session = None  # Any loaded ONNX model is now stale
+        self._score_cache.clear()
+        self._iso_range = None
+        
+        # Train Isolation Forest (unsupervised, on the already scaled
+        # training split; the validation rows stay unseen by both models)
         print("[*] Training Isolation Forest for anomaly detection...")
-        X_all_scaled = self.scaler.transform(X)
-        self.isolation_forest.fit(X_all_scaled)
+        self.isolation_forest.fit(X_train_scaled)
         
         self.is_trained = True
         
         # Evaluate
         print("[*] Evaluating models...")
-        metrics = self._evaluate(X_val_scaled, y_val)
+        metrics = self._evaluate(X_val_scaled, y_val, verbose)
         
         # Feature importance
         feature_importance = pd.DataFrame({
             'feature': self.feature_names,
-            'importance': self.rf_classifier.feature_importances_
+            'importance': self._importances_np
         }).sort_values('importance', ascending=False)
         
-        print("\n[*] Top 10 Most Important Features:")
-        print(feature_importance.head(10).to_string(index=False))
+        if verbose:
+            print("\n[*] Top 10 Most Important Features:")
+            print(feature_importance.head(10).to_string(index=False))
         
         metrics['feature_importance'] = feature_importance.to_dict('records')
         
         return metrics
     
-    def _evaluate(self, X_val: np.ndarray, y_val: np.ndarray) -> Dict:
-        """Internal evaluation method"""
-        y_pred = self.rf_classifier.predict(X_val)
-        y_pred_proba = self.rf_classifier.predict_proba(X_val)[:, 1]
+    def _evaluate(self, X_val: np.ndarray, y_val: np.ndarray, verbose: bool = True) -> Dict:
+        """
+        Internal evaluation method.
+        The confusion matrix comes from one bincount; per-class metrics
+        are derived from it, laid out like sklearn's classification_report.
+        """
+        y_val = np.asarray(y_val, dtype=np.int64)
+        y_pred_proba = self._rf_predict_proba(X_val)[:, 1]
+        y_pred = (y_pred_proba > 0.5).astype(np.int64)
+        
+        tn, fp, fn, tp = np.bincount(2 * y_val + y_pred, minlength=4).tolist()
+        total = tn + fp + fn + tp
+        
+        report = {}
+        for name, hits, false_pos, false_neg in (('Benign', tn, fn, fp),
+                                                 ('Attack', tp, fp, fn)):
+            precision = hits / (hits + false_pos) if hits + false_pos else 0.0
+            recall = hits / (hits + false_neg) if hits + false_neg else 0.0
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+            report[name] = {
+                'precision': precision,
+                'recall': recall,
+                'f1-score': f1,
+                'support': float(hits + false_neg)
+            }
+        
+        accuracy = (tp + tn) / total
+        report['accuracy'] = accuracy
+        for avg, weights in (('macro avg', (1, 1)), ('weighted avg', (tn + fp, fn + tp))):
+            benign, attack = report['Benign'], report['Attack']
+            report[avg] = {
+                key: (weights[0] * benign[key] + weights[1] * attack[key]) / sum(weights)
+                for key in ('precision', 'recall', 'f1-score')
+            }
+            report[avg]['support'] = float(total)
         
         metrics = {
-            'accuracy': np.mean(y_pred == y_val),
-            'confusion_matrix': confusion_matrix(y_val, y_pred).tolist(),
-            'classification_report': classification_report(
-                y_val, y_pred, 
-                target_names=['Benign', 'Attack'],
-                output_dict=True
-            ),
+            'accuracy': accuracy,
+            'confusion_matrix': [[tn, fp], [fn, tp]],
+            'classification_report': report,
             'roc_auc': roc_auc_score(y_val, y_pred_proba)
         }
         
-        print(f"\n[+] Validation Accuracy: {metrics['accuracy']:.3f}")
-        print(f"[+] ROC-AUC Score: {metrics['roc_auc']:.3f}")
-        print("\n[+] Classification Report:")
-        print(classification_report(y_val, y_pred, target_names=['Benign', 'Attack']))
+        if verbose:
+            print(f"\n[+] Validation Accuracy: {metrics['accuracy']:.3f}")
+            print(f"[+] ROC-AUC Score: {metrics['roc_auc']:.3f}")
+            print("\n[+] Classification Report:")
+            print(classification_report(y_val, y_pred, target_names=['Benign', 'Attack']))
         
         return metrics
     
-    def predict(self, events: List[Dict]) -> np.ndarray:
+    def predict(self, events: List[Dict], reuse_normalization: bool = False) -> np.ndarray:
         """
         Predict attack probability for events.
         
+        Args:
+            events: Events to score
+            reuse_normalization: Normalize Isolation Forest scores with the
+                min/max of the last predict batch that had more than one
+                distinct score, instead of this one, for repeated batches
+                from the same distribution (and for single events, whose
+                own min/max is degenerate)
+            
         Returns:
             Array of threat scores (0-100)
         """
@@ -396,23 +930,146 @@ class CyberAttackClassifier:
             raise ValueError("Model must be trained before prediction")
         
         X = self.prepare_features(events)
-        X_scaled = self.scaler.transform(X)
+        X_scaled = self._scale(X)
         
         # Get predictions from both models
-        rf_proba = self.rf_classifier.predict_proba(X_scaled)[:, 1]
-        iso_scores = self.isolation_forest.score_samples(X_scaled)
+        rf_proba, iso_scores = self._cached_scores(X_scaled)
+        
+        if reuse_normalization and self._iso_range is not None:
+            return self._combine_scores(rf_proba, iso_scores, self._iso_range)
+        
+        # Only a batch with a real spread of scores is worth reusing
+        if not self._only_rf and iso_scores.size > 1:
+            iso_min, iso_max = iso_scores.min(), iso_scores.max()
+            if iso_max > iso_min:
+                self._iso_range = (iso_min, iso_max)
+        
+        return self._combine_scores(rf_proba, iso_scores)
+    
+    def _cached_scores(self, X_scaled: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        RF attack probability and raw Isolation Forest score per row.
+        
+        Results are cached per scaled feature row (LRU), so scoring an event
+        again - e.g. explaining one that was just predicted - only runs the
+        models for rows not seen before. Raw scores are cached rather than
+        threat scores, since the IF normalization depends on the batch.
+        With if_weight == 0 the Isolation Forest is never run and its
+        scores are NaN.
+        """
+        X = np.ascontiguousarray(X_scaled, dtype=np.float32)
+        n = X.shape[0]
+        rf_proba = np.empty(n)
+        iso_scores = np.empty(n)
+        
+        keys = [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in X]
+        missing = np.zeros(n, dtype=bool)
+        cache = self._score_cache
+        for i, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is None:
+                missing[i] = True
+            else:
+                cache.move_to_end(key)
+                rf_proba[i], iso_scores[i] = cached
+        
+        if missing.any():
+            X_missing = X[missing]
+            rf_proba[missing] = self._rf_predict_proba(X_missing)[:, 1]
+            if self._only_rf:
+                iso_scores[missing] = np.nan
+            else:
+                iso_scores[missing] = self.isolation_forest.score_samples(X_missing)
+            
+            for i in np.flatnonzero(missing):
+                cache[keys[i]] = (rf_proba[i], iso_scores[i])
+            while len(cache) > self.SCORE_CACHE_SIZE:
+                cache.popitem(last=False)
+        
+        return rf_proba, iso_scores
+    
+    def _rf_predict_proba(self, X_scaled: np.ndarray) -> np.ndarray:
+        """
+        Random Forest class probabilities, via ONNX Runtime when loaded
+        and via the LightGBM booster when that is the RF backend.
+        
+        For a sklearn forest, small batches walk the trees serially in this thread: for a few
+        rows, joblib's per-call dispatch across n_jobs workers costs far
+        more than the tree traversal itself.
+        """
+        if self._ort_session is not None:
+            return self._ort_session.run(
+                None, {'X': np.asarray(X_scaled, dtype=np.float32)}
+            )[1]
+        
+        booster = self._lgb_booster()
+        if booster is not None:
+            attack_proba = booster.predict(X_scaled)
+            return np.column_stack([1 - attack_proba, attack_proba])
+        
+        if X_scaled.shape[0] >= self.SERIAL_PREDICT_MAX_ROWS:
+            return self.rf_classifier.predict_proba(X_scaled)
+        
+        # Trees split on float32, so validate/convert once for all of them
+        X = np.ascontiguousarray(X_scaled, dtype=np.float32)
+        estimators = self.rf_classifier.estimators_
+        proba = np.zeros((X.shape[0], self.rf_classifier.n_classes_))
+        for estimator in estimators:
+            proba += estimator.predict_proba(X, check_input=False)
+        proba /= len(estimators)
+        return proba
+    
+    def _lgb_booster(self):
+        """LightGBM booster behind the RF model, or None for a sklearn forest"""
+        if not LIGHTGBM_AVAILABLE:
+            return None
+        if isinstance(self.rf_classifier, lgb.Booster):
+            return self.rf_classifier
+        if isinstance(self.rf_classifier, lgb.LGBMClassifier):
+            return self.rf_classifier.booster_
+        return None
+    
+    def _feature_importances(self) -> np.ndarray:
+        """
+        Normalized RF feature importances for either model backend.
+        sklearn recomputes these from every tree on each access, so they
+        are read once into _importances_np after fitting or loading.
+        """
+        booster = self._lgb_booster()
+        if booster is None:
+            return self.rf_classifier.feature_importances_
+        
+        gain = booster.feature_importance(importance_type='gain')
+        total = gain.sum()
+        return gain / total if total > 0 else gain
+    
+    def _combine_scores(self, 
+                        rf_proba: np.ndarray, 
+                        iso_scores: np.ndarray,
+                        iso_range: Optional[Tuple[float, float]] = None) -> np.ndarray:
+        """
+        Blend RF probabilities and Isolation Forest scores into 0-100 threat
+        scores. IF scores are min/max normalized over iso_range, or over
+        the batch itself when it is None.
+        """
+        if self._only_rf:
+            return (rf_proba * 100).astype(int)
         
         # Normalize isolation forest scores to [0, 1]
         # More negative = more anomalous
-        iso_min, iso_max = iso_scores.min(), iso_scores.max()
+        if iso_range is not None:
+            iso_min, iso_max = iso_range
+        else:
+            iso_min, iso_max = iso_scores.min(), iso_scores.max()
+        
         if iso_max > iso_min:
-            iso_normalized = 1 - (iso_scores - iso_min) / (iso_max - iso_min)
+            iso_normalized = np.clip(1 - (iso_scores - iso_min) / (iso_max - iso_min), 0, 1)
         else:
             iso_normalized = np.zeros_like(iso_scores)
         
         # Combine predictions (weighted average)
-        # RF gets 70% weight (supervised), IF gets 30% (anomaly detection)
-        combined_score = 0.7 * rf_proba + 0.3 * iso_normalized
+        # Defaults: RF 70% (supervised), IF 30% (anomaly detection)
+        combined_score = self.rf_weight * rf_proba + self.if_weight * iso_normalized
         
         # Convert to 0-100 scale
         threat_scores = (combined_score * 100).astype(int)
@@ -421,82 +1078,163 @@ class CyberAttackClassifier:
     
     def explain_prediction(self, 
                           event: Dict, 
-                          use_shap: bool = True) -> Dict:
+                          use_shap: bool = False) -> Dict:
         """
         Explain why a prediction was made.
         
         Args:
             event: Single event to explain
-            use_shap: Use SHAP for explanation (if available)
+            use_shap: Also compute SHAP values (if available); off by default
+                since the importance-based contributions are far cheaper
             
         Returns:
             Explanation dictionary
         """
-        if not self.is_trained:
-            raise ValueError("Model must be trained before explanation")
-        
-        X = self.prepare_features([event])
-        X_scaled = self.scaler.transform(X)
-        
-        # Get prediction
-        threat_score = self.predict([event])[0]
-        rf_proba = self.rf_classifier.predict_proba(X_scaled)[0, 1]
-        
-        explanation = {
-            'threat_score': int(threat_score),
-            'rf_probability': float(rf_proba),
-            'feature_values': X.iloc[0].to_dict()
-        }
-        
-        # Feature importance based explanation
-        importances = self.rf_classifier.feature_importances_
-        feature_contributions = []
+        return self.explain_predictions([event], use_shap)[0]
+    
+    def explain_predictions(self, 
+                            events: List[Dict], 
+                            use_shap: bool = False) -> List[Dict]:
+        """
+        Explain predictions for a batch of events.
+        Features, scores and SHAP values are computed once for the whole batch.
         
-        for i, (name, value) in enumerate(X.iloc[0].items()):
-            feature_contributions.append({
-                'feature': name,
-                'value': float(value),
-                'importance': float(importances[i]),
-                'contribution': float(importances[i] * value)
-            })
+        Args:
+            events: Events to explain
+            use_shap: Also compute SHAP values (if available); off by default
+                since the importance-based contributions are far cheaper
+            
+        Returns:
+            One explanation dictionary per event
         
-        feature_contributions.sort(key=lambda x: abs(x['contribution']), reverse=True)
-        explanation['top_contributors'] = feature_contributions[:5]
+        SHAP values are in the units of the RF backend's output: log-odds
+        for the LightGBM random forest, attack-class probability for the
+        sklearn forest (shap.TreeExplainer). Values from the two backends
+        are therefore not comparable with each other.
+        """
+        if not self.is_trained:
+            raise ValueError("Model must be trained before explanation")
         
-        # SHAP explanation (if available)
-        if use_shap and SHAP_AVAILABLE:
+        X = self.prepare_features(events)
+        X_scaled = self._scale(X)
+        
+        # Get predictions
+        rf_proba, iso_scores = self._cached_scores(X_scaled)
+        threat_scores = self._combine_scores(rf_proba, iso_scores)
+        
+        # SHAP explanation (if available). LightGBM computes exact
+        # TreeSHAP values itself; the last column is the expected value.
+        # In random forest mode the contributions are summed over the trees
+        # while the model output (log-odds) is their average, so they are
+        # divided by the tree count.
+        shap_values = None
+        booster = self._lgb_booster()
+        if use_shap and booster is not None:
+            contributions = booster.predict(X_scaled, pred_contrib=True)
+            shap_values = contributions[:, :-1] / booster.num_trees()
+        elif use_shap and self._shap_explainer is not None:
             try:
-                explainer = shap.TreeExplainer(self.rf_classifier)
-                shap_values = explainer.shap_values(X_scaled)
+                shap_values = self._shap_explainer.shap_values(X_scaled)
                 
                 if isinstance(shap_values, list):
                     shap_values = shap_values[1]  # Get values for attack class
-                
-                shap_explanation = []
-                for i, name in enumerate(self.feature_names):
-                    shap_explanation.append({
-                        'feature': name,
-                        'shap_value': float(shap_values[0][i]),
-                        'feature_value': float(X.iloc[0, i])
-                    })
-                
-                shap_explanation.sort(key=lambda x: abs(x['shap_value']), reverse=True)
-                explanation['shap_values'] = shap_explanation[:10]
+                elif shap_values.ndim == 3:
+                    shap_values = shap_values[:, :, 1]
                 
             except Exception as e:
                 print(f"[!] SHAP explanation failed: {e}")
+                shap_values = None
+        
+        # Feature importance based explanation: rank every row's
+        # contributions at once, then build only the top 5 records
+        names = self.feature_names
+        importances = self._importances_np
+        values = X.to_numpy(dtype=np.float64)
+        contributions = importances * values
+        top = np.argsort(-np.abs(contributions), axis=1, kind='stable')[:, :5]
+        if shap_values is not None:
+            shap_values = np.asarray(shap_values, dtype=np.float64)
+            shap_top = np.argsort(-np.abs(shap_values), axis=1, kind='stable')[:, :10]
+        explanations = []
+        
+        for row in range(len(events)):
+            row_values = values[row]
+            explanation = {
+                'threat_score': int(threat_scores[row]),
+                'rf_probability': float(rf_proba[row]),
+                'feature_values': dict(zip(names, row_values.tolist()))
+            }
+            
+            explanation['top_contributors'] = [
+                {
+                    'feature': names[i],
+                    'value': float(row_values[i]),
+                    'importance': float(importances[i]),
+                    'contribution': float(contributions[row, i])
+                }
+                for i in top[row]
+            ]
+            
+            if shap_values is not None:
+                explanation['shap_values'] = [
+                    {
+                        'feature': names[i],
+                        'shap_value': float(shap_values[row, i]),
+                        'feature_value': float(row_values[i])
+                    }
+                    for i in shap_top[row]
+                ]
+            
+            explanations.append(explanation)
         
-        return explanation
+        return explanations
+    
+    def _build_shap_explainer(self):
+        """Build the SHAP tree explainer once per trained/loaded model"""
+        self._shap_explainer = None
+        if not SHAP_AVAILABLE or self._lgb_booster() is not None:
+            return
+        
+        try:
+            self._shap_explainer = shap.TreeExplainer(
+                self.rf_classifier, feature_perturbation='tree_path_dependent'
+            )
+        except Exception as e:
+            print(f"[!] SHAP explainer unavailable: {e}")
     
     def save_model(self, path: str = 'models/'):
         """Save trained models to disk"""
-        import os
         os.makedirs(path, exist_ok=True)
         
-        joblib.dump(self.rf_classifier, f'{path}/rf_classifier.pkl')
         joblib.dump(self.isolation_forest, f'{path}/isolation_forest.pkl')
         joblib.dump(self.scaler, f'{path}/scaler.pkl')
         
+        # Only one RF format is kept, so load_model never picks up a stale one
+        booster = self._lgb_booster()
+        stale = ['rf_classifier.pkl', 'rf_classifier.onnx'] if booster is not None \
+            else ['rf_classifier.txt']
+        for name in stale:
+            if os.path.exists(f'{path}/{name}'):
+                os.remove(f'{path}/{name}')
+        
+        if booster is not None:
+            booster.save_model(f'{path}/rf_classifier.txt')
+        else:
+            joblib.dump(self.rf_classifier, f'{path}/rf_classifier.pkl')
+        
+        # ONNX copy of the Random Forest for ONNX Runtime inference
+        if booster is None and SKL2ONNX_AVAILABLE:
+            try:
+                onnx_model = convert_sklearn(
+                    self.rf_classifier,
+                    initial_types=[('X', FloatTensorType([None, len(self.feature_names)]))],
+                    options={id(self.rf_classifier): {'zipmap': False}}
+                )
+                with open(f'{path}/rf_classifier.onnx', 'wb') as f:
+                    f.write(onnx_model.SerializeToString())
+            except Exception as e:
+                print(f"[!] ONNX export failed: {e}")
+        
         metadata = {
             'feature_names': self.feature_names,
             'is_trained': self.is_trained,
@@ -510,7 +1248,18 @@ class CyberAttackClassifier:
     
     def load_model(self, path: str = 'models/'):
         """Load trained models from disk"""
-        self.rf_classifier = joblib.load(f'{path}/rf_classifier.pkl')
+        # Nothing derived from the previous model may outlive it
+        self._score_cache.clear()
+        self._iso_range = None
+        self._ort_session = None
+        
+        lgb_path = f'{path}/rf_classifier.txt'
+        if os.path.exists(lgb_path):
+            if not LIGHTGBM_AVAILABLE:
+                raise ImportError("LightGBM model found; run: pip install lightgbm")
+            self.rf_classifier = lgb.Booster(model_file=lgb_path)
+        else:
+            self.rf_classifier = joblib.load(f'{path}/rf_classifier.pkl')
         self.isolation_forest = joblib.load(f'{path}/isolation_forest.pkl')
         self.scaler = joblib.load(f'{path}/scaler.pkl')
         
@@ -521,6 +1270,16 @@ class CyberAttackClassifier:
         self.is_trained = metadata['is_trained']
         self.random_state = metadata['random_state']
         
+        self._importances_np = self._feature_importances()
+        self._build_shap_explainer()
+        
+        onnx_path = f'{path}/rf_classifier.onnx'
+        if ONNXRUNTIME_AVAILABLE and os.path.exists(onnx_path) \
+                and self._lgb_booster() is None:
+            self._ort_session = onnxruntime.InferenceSession(
+                onnx_path, providers=['CPUExecutionProvider']
+            )
+        
         print(f"[+] Models loaded from {path}")
 
 
@@ -534,48 +1293,24 @@ class DatasetGenerator:
     Useful for testing and demonstration.
     """
     
-    @staticmethod
-    def generate_benign_event(index: int) -> Dict:
-        """Generate a benign user event"""
-        base_time = datetime.now() - timedelta(hours=np.random.randint(0, 24))
-        
-        # Normal user behavior
-        timestamps = [
-            base_time + timedelta(seconds=np.random.uniform(10, 300) * i)
-            for i in range(np.random.randint(3, 10))
-        ]
-        
-        benign_commands = ['ls', 'pwd', 'whoami', 'cat file.txt', 'cd /home']
-        
-        return {
-            'event_id': f'benign_{index}',
-            'login_failures': np.random.randint(0, 2),
-            'consecutive_failures': 0,
-            'command': np.random.choice(benign_commands),
-            'timestamps': timestamps,
-            'payload': f'username=user{np.random.randint(1, 100)}',
-            'user_agent': np.random.choice([
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
-                'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
-            ]),
-            'all_user_agents': [],  # Will be filled later
-            'total_requests': len(timestamps),
-            'unique_commands': np.random.randint(2, 6),
-            'session_duration': (timestamps[-1] - timestamps[0]).total_seconds()
-        }
+    BENIGN_COMMANDS = ['ls', 'pwd', 'whoami', 'cat file.txt', 'cd /home']
+    BENIGN_USER_AGENTS = [
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36'
+    ]
+    
+    ATTACK_TYPES = ['sql_injection', 'brute_force', 'xss', 'generic']
+    ATTACK_USER_AGENTS = [
+        'sqlmap/1.4.7',
+        'python-requests/2.28.0',
+        'curl/7.68.0',
+        'Nikto/2.1.6'
+    ]
     
     @staticmethod
-    def generate_attack_event(index: int, attack_type: str = 'sql_injection') -> Dict:
-        """Generate an attack event"""
-        base_time = datetime.now() - timedelta(hours=np.random.randint(0, 24))
-        
-        # Attack patterns have regular intervals (automated)
-        timestamps = [
-            base_time + timedelta(seconds=i * np.random.uniform(0.5, 2))
-            for i in range(np.random.randint(10, 50))
-        ]
-        
+    def _attack_samples(attack_type: str) -> Tuple[List[str], List[str]]:
+        """Candidate (payloads, commands) for an attack type"""
         if attack_type == 'sql_injection':
             payloads = [
                 "admin' OR '1'='1",
@@ -601,6 +1336,40 @@ class DatasetGenerator:
             payloads = ['malicious_payload'] * 10
             commands = ['suspicious_command'] * 10
         
+        return payloads, commands
+    
+    @staticmethod
+    def generate_benign_event(index: int) -> Dict:
+        """Generate a benign user event"""
+        # Normal user behavior
+        timestamps = DatasetGenerator._event_timestamps(
+            np.random.randint(3, 10), (10, 300)
+        )
+        
+        return {
+            'event_id': f'benign_{index}',
+            'login_failures': np.random.randint(0, 2),
+            'consecutive_failures': 0,
+            'command': np.random.choice(DatasetGenerator.BENIGN_COMMANDS),
+            'timestamps': timestamps,
+            'payload': f'username=user{np.random.randint(1, 100)}',
+            'user_agent': np.random.choice(DatasetGenerator.BENIGN_USER_AGENTS),
+            'all_user_agents': [],  # Will be filled later
+            'total_requests': len(timestamps),
+            'unique_commands': np.random.randint(2, 6),
+            'session_duration': float((timestamps[-1] - timestamps[0]) / np.timedelta64(1, 's'))
+        }
+    
+    @staticmethod
+    def generate_attack_event(index: int, attack_type: str = 'sql_injection') -> Dict:
+        """Generate an attack event"""
+        # Attack patterns have regular intervals (automated)
+        timestamps = DatasetGenerator._event_timestamps(
+            np.random.randint(10, 50), (0.5, 2)
+        )
+        
+        payloads, commands = DatasetGenerator._attack_samples(attack_type)
+        
         return {
             'event_id': f'attack_{attack_type}_{index}',
             'login_failures': np.random.randint(5, 50),
@@ -608,51 +1377,152 @@ class DatasetGenerator:
             'command': np.random.choice(commands),
             'timestamps': timestamps,
             'payload': np.random.choice(payloads),
-            'user_agent': np.random.choice([
-                'sqlmap/1.4.7',
-                'python-requests/2.28.0',
-                'curl/7.68.0',
-                'Nikto/2.1.6'
-            ]),
+            'user_agent': np.random.choice(DatasetGenerator.ATTACK_USER_AGENTS),
             'all_user_agents': [],  # Will be filled later
             'total_requests': len(timestamps),
             'unique_commands': np.random.randint(1, 3),
-            'session_duration': (timestamps[-1] - timestamps[0]).total_seconds()
+            'session_duration': float((timestamps[-1] - timestamps[0]) / np.timedelta64(1, 's'))
         }
     
+    @staticmethod
+    def _event_timestamps(length: int, step_range: Tuple[float, float]) -> np.ndarray:
+        """
+        One datetime64 timestamp sequence: starts at now minus a random
+        number of hours, i-th entry is i * uniform(step_range) seconds later.
+        """
+        base_time = (np.datetime64(datetime.now(), 'us')
+                     - np.timedelta64(np.random.randint(0, 24), 'h'))
+        offsets = np.arange(length) * np.random.uniform(*step_range, size=length)
+        return base_time + (offsets * 1e6).astype(np.int64).astype('timedelta64[us]')
+    
+    @staticmethod
+    def _draw_timestamps(rng: np.random.Generator,
+                         n: int,
+                         length_range: Tuple[int, int],
+                         step_range: Tuple[float, float]) -> Tuple[List[np.ndarray], np.ndarray]:
+        """
+        Draw n timestamp sequences at once: sequence j starts at now minus
+        a random number of hours and its i-th entry is i * uniform(step_range)
+        seconds later.
+        
+        Returns:
+            (list of datetime64 arrays, session durations in seconds)
+        """
+        lengths = rng.integers(*length_range, size=n)
+        starts = np.cumsum(lengths) - lengths
+        
+        # Position of every entry within its own sequence
+        positions = np.arange(lengths.sum()) - np.repeat(starts, lengths)
+        offsets = positions * rng.uniform(*step_range, size=positions.size)
+        
+        now = np.datetime64(datetime.now(), 'us')
+        hours = rng.integers(0, 24, size=n)
+        base_times = now - hours.astype('timedelta64[h]')
+        flat = (np.repeat(base_times, lengths)
+                + (offsets * 1e6).astype(np.int64).astype('timedelta64[us]'))
+        
+        # Each sequence is a view into the one flat array
+        ends = starts + lengths
+        sequences = np.split(flat, ends[:-1]) if n else []
+        durations = (offsets[ends - 1] * 1e6).astype(np.int64) / 1e6
+        return sequences, durations
+    
     @staticmethod
     def generate_dataset(n_benign: int = 500, 
-                        n_attacks: int = 200) -> Tuple[List[Dict], List[int]]:
+                        n_attacks: int = 200,
+                        seed: Optional[int] = None) -> Tuple[List[Dict], List[int]]:
         """
         Generate complete dataset with benign and attack events.
+        Every field is drawn for all events at once, then zipped into dicts.
         
+        Args:
+            n_benign: Number of benign events
+            n_attacks: Number of attack events
+            seed: Seed for reproducible datasets
+            
         Returns:
             Tuple of (events, labels)
         """
-        events = []
-        labels = []
+        rng = np.random.default_rng(seed)
         
         print(f"[*] Generating {n_benign} benign events...")
-        for i in range(n_benign):
-            events.append(DatasetGenerator.generate_benign_event(i))
-            labels.append(0)
+        timestamps, durations = DatasetGenerator._draw_timestamps(
+            rng, n_benign, (3, 10), (10, 300)
+        )
+        login_failures = rng.integers(0, 2, size=n_benign).tolist()
+        commands = rng.choice(DatasetGenerator.BENIGN_COMMANDS, size=n_benign).tolist()
+        user_ids = rng.integers(1, 100, size=n_benign).tolist()
+        user_agents = rng.choice(DatasetGenerator.BENIGN_USER_AGENTS, size=n_benign).tolist()
+        unique_commands = rng.integers(2, 6, size=n_benign).tolist()
+        durations = durations.tolist()
+        
+        events = [
+            {
+                'event_id': f'benign_{i}',
+                'login_failures': login_failures[i],
+                'consecutive_failures': 0,
+                'command': commands[i],
+                'timestamps': timestamps[i],
+                'payload': f'username=user{user_ids[i]}',
+                'user_agent': user_agents[i],
+                'total_requests': len(timestamps[i]),
+                'unique_commands': unique_commands[i],
+                'session_duration': durations[i]
+            }
+            for i in range(n_benign)
+        ]
         
         print(f"[*] Generating {n_attacks} attack events...")
-        attack_types = ['sql_injection', 'brute_force', 'xss', 'generic']
-        for i in range(n_attacks):
-            attack_type = np.random.choice(attack_types)
-            events.append(DatasetGenerator.generate_attack_event(i, attack_type))
-            labels.append(1)
-        
-        # Fill in user agent frequencies
-        all_uas = [e['user_agent'] for e in events]
-        for event in events:
-            event['all_user_agents'] = all_uas
+        attack_types = rng.choice(DatasetGenerator.ATTACK_TYPES, size=n_attacks)
+        timestamps, durations = DatasetGenerator._draw_timestamps(
+            rng, n_attacks, (10, 50), (0.5, 2)
+        )
+        login_failures = rng.integers(5, 50, size=n_attacks).tolist()
+        consecutive_failures = rng.integers(5, 20, size=n_attacks).tolist()
+        user_agents = rng.choice(DatasetGenerator.ATTACK_USER_AGENTS, size=n_attacks).tolist()
+        unique_commands = rng.integers(1, 3, size=n_attacks).tolist()
+        durations = durations.tolist()
+        
+        # Payload/command pools differ per attack type: draw per type
+        payloads = np.empty(n_attacks, dtype=object)
+        commands = np.empty(n_attacks, dtype=object)
+        for attack_type in DatasetGenerator.ATTACK_TYPES:
+            mask = attack_types == attack_type
+            count = int(mask.sum())
+            type_payloads, type_commands = DatasetGenerator._attack_samples(attack_type)
+            payloads[mask] = rng.choice(type_payloads, size=count)
+            commands[mask] = rng.choice(type_commands, size=count)
+        attack_types = attack_types.tolist()
+        
+        events += [
+            {
+                'event_id': f'attack_{attack_types[i]}_{i}',
+                'login_failures': login_failures[i],
+                'consecutive_failures': consecutive_failures[i],
+                'command': commands[i],
+                'timestamps': timestamps[i],
+                'payload': payloads[i],
+                'user_agent': user_agents[i],
+                'total_requests': len(timestamps[i]),
+                'unique_commands': unique_commands[i],
+                'session_duration': durations[i]
+            }
+            for i in range(n_attacks)
+        ]
+        labels = [0] * n_benign + [1] * n_attacks
         
-        # Shuffle
-        indices = np.random.permutation(len(events))
-        events = [events[i] for i in indices]
-        labels = [labels[i] for i in indices]
+        # Fill in user agent frequencies from one shared count
+        ua_counts = Counter(e['user_agent'] for e in events)
+        ua_total = len(events)
+        for event in events:
+            event['user_agent_frequency'] = ua_counts[event['user_agent']] / ua_total
+        
+        # Shuffle (itemgetter gathers in C; with one index it returns the
+        # bare item rather than a tuple)
+        indices = rng.permutation(len(events))
+        if len(events) > 1:
+            events = list(itemgetter(*indices.tolist())(events))
+        labels = np.asarray(labels, dtype=np.int8)[indices].tolist()
         
         print(f"[+] Generated {len(events)} total events")
         
@@ -0,0 +1,47 @@
+"""
+Tests for the ML CyberAttackClassifier:
+scale of the LightGBM SHAP contributions in explanations.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml'))
+
+from ml_attack_classifier import (  # noqa: E402
+    LIGHTGBM_AVAILABLE,
+    CyberAttackClassifier,
+    DatasetGenerator,
+)
+
+
+@pytest.fixture(scope='module')
+def trained_classifier():
+    events, labels = DatasetGenerator.generate_dataset(n_benign=250, n_attacks=100, seed=3)
+    classifier = CyberAttackClassifier()
+    classifier.train(events, labels, verbose=False)
+    return classifier
+
+
+@pytest.mark.skipif(not LIGHTGBM_AVAILABLE, reason="lightgbm not installed")
+def test_lightgbm_contributions_are_in_log_odds(trained_classifier):
+    """Contributions plus the expected value add up to the model's log-odds"""
+    events, _ = DatasetGenerator.generate_dataset(n_benign=10, n_attacks=10, seed=4)
+
+    explanations = trained_classifier.explain_predictions(events, use_shap=True)
+
+    booster = trained_classifier._lgb_booster()
+    X_scaled = trained_classifier._scale(trained_classifier.prepare_features(events))
+    contributions = booster.predict(X_scaled, pred_contrib=True) / booster.num_trees()
+    names = trained_classifier.feature_names
+
+    for row, explanation in enumerate(explanations):
+        p = explanation['rf_probability']
+        assert contributions[row].sum() == pytest.approx(np.log(p / (1 - p)), abs=1e-6)
+
+        for entry in explanation['shap_values']:
+            column = names.index(entry['feature'])
+            assert entry['shap_value'] == pytest.approx(contributions[row, column])
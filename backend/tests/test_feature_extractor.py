@@ -0,0 +1,124 @@
+"""
+Tests for the ML FeatureExtractor:
+timestamp parsing and interval features, signature counting, and parity
+between the batch and single-event paths.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml'))
+
+from ml_attack_classifier import DatasetGenerator, FeatureExtractor  # noqa: E402
+
+
+@pytest.fixture
+def extractor():
+    return FeatureExtractor()
+
+
+@pytest.fixture(params=['hyperscan', 'regex'])
+def signature_backend(request, monkeypatch):
+    """Run signature tests on both matching backends"""
+    if request.param == 'regex':
+        monkeypatch.setattr(FeatureExtractor, 'SIGNATURE_DB', None)
+    elif FeatureExtractor.SIGNATURE_DB is None:
+        pytest.skip("hyperscan not installed")
+    return request.param
+
+
+def test_interval_features_across_dst_change(extractor):
+    """Offsets changing within one session are compared in UTC"""
+    timestamps = [
+        '2024-03-31T01:59:00+01:00',
+        '2024-03-31T03:00:00+02:00',  # 60 s later, after the clocks moved
+        '2024-03-31T03:02:00+02:00',
+    ]
+
+    features = extractor.calculate_request_interval_features(timestamps)
+
+    assert features['min_interval'] == pytest.approx(60.0)
+    assert features['max_interval'] == pytest.approx(120.0)
+    assert features['mean_interval'] == pytest.approx(90.0)
+
+
+def test_batch_interval_features_with_mixed_offsets(extractor):
+    """Events with different (or no) UTC offsets parse in one batch"""
+    timestamp_lists = [
+        ['2024-01-01T00:00:00+00:00', '2024-01-01T00:00:10+00:00'],
+        ['2024-01-01T05:30:00+05:30', '2024-01-01T05:30:20+05:30'],
+        ['2024-01-01T00:00:00', '2024-01-01T00:00:30'],
+    ]
+
+    features = extractor.calculate_request_interval_features_batch(timestamp_lists)
+
+    mean_column = extractor.INTERVAL_COLUMNS.index('mean_interval')
+    assert features[:, mean_column] == pytest.approx([10.0, 20.0, 30.0])
+    for row, timestamps in enumerate(timestamp_lists):
+        single = extractor.calculate_request_interval_features(timestamps)
+        assert features[row] == pytest.approx(
+            [single[name] for name in extractor.INTERVAL_COLUMNS]
+        )
+
+
+def test_batch_interval_segments_match_single_sequences(extractor):
+    """Per-sequence reductions stay within their own sequence"""
+    base = np.datetime64('2024-01-01T00:00:00', 'us')
+    steps = ([], [5], [1, 2], [3], [10, 10, 10], [], [7, 1, 4, 30], [2])
+    timestamp_lists = [
+        base + np.cumsum([0] + step).astype('timedelta64[s]') for step in steps
+    ]
+    timestamp_lists[1] = timestamp_lists[1][:1]  # single timestamp
+    timestamp_lists[5] = timestamp_lists[5][:0]  # no timestamps
+
+    features = extractor.calculate_request_interval_features_batch(timestamp_lists)
+
+    for row, timestamps in enumerate(timestamp_lists):
+        single = extractor.calculate_request_interval_features(timestamps)
+        assert features[row] == pytest.approx(
+            [single[name] for name in extractor.INTERVAL_COLUMNS]
+        )
+
+
+def test_batch_interval_features_without_sequences(extractor):
+    features = extractor.calculate_request_interval_features_batch([[], ['2024-01-01T00:00:00']])
+
+    assert features.shape == (2, len(extractor.INTERVAL_COLUMNS))
+    assert not features.any()
+
+
+def test_signature_hits_map_to_their_payload(extractor, signature_backend):
+    payloads = [
+        '',
+        'id=1 UNION SELECT password',
+        '',
+        'name=<script',  # hit ends exactly at the payload boundary
+        "x' or 1=1 <script>javascript:",
+        'union select 1 union select 2',  # one signature, counted once
+        'a union',  # continued in the next payload, never across the NUL
+        ' select b',
+    ]
+
+    features = extractor.calculate_signature_features_batch(payloads)
+
+    assert features.tolist() == [
+        [0, 0], [1, 0], [0, 0], [0, 1], [1, 2], [1, 0], [0, 0], [0, 0],
+    ]
+
+
+def test_signature_features_without_payloads(extractor, signature_backend):
+    assert extractor.calculate_signature_features_batch([]).shape == (0, 2)
+
+
+def test_batch_features_match_single_events(extractor):
+    events, _ = DatasetGenerator.generate_dataset(n_benign=60, n_attacks=40, seed=7)
+
+    batch = extractor.extract_features_batch(events, update_history=False)
+    single = np.stack([
+        extractor.extract_features(event, update_history=False) for event in events
+    ])
+
+    np.testing.assert_allclose(batch.to_numpy(), single, rtol=1e-5, atol=1e-6)
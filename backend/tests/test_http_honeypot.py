@@ -0,0 +1,95 @@
+"""
+Tests for the HTTP honeypot application:
+middleware ordering and request-size limits, Accept-Encoding negotiation
+and per-IP rate limiting.
+"""
+
+import os
+import sys
+from collections import deque
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'honeypots'))
+
+import http_honeypot  # noqa: E402
+from http_honeypot import MAX_BODY_SIZE, RateLimiter, _accepts_gzip, app  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_honeypot.EventLogger, 'LOG_FILE', str(tmp_path / 'events.jsonl'))
+    return TestClient(app)
+
+
+def test_oversized_body_rejected_with_cors_headers(client):
+    response = client.post(
+        '/admin/login',
+        content=b'x',
+        headers={
+            'Origin': 'http://attacker.example',
+            'Content-Length': str(MAX_BODY_SIZE + 1),
+        },
+    )
+
+    assert response.status_code == 413
+    assert response.headers['access-control-allow-origin'] in ('*', 'http://attacker.example')
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('', False),
+    ('gzip', True),
+    ('GZIP', True),
+    ('deflate, gzip;q=0.5', True),
+    ('gzip;q=0', False),
+    ('gzip; q=0.0, br', False),
+    ('gzip;q=bogus', False),
+    ('*', True),
+    ('*;q=0', False),
+    ('*, gzip;q=0', False),
+    ('gzip;q=0.1, *;q=0', True),
+    ('identity, br', False),
+])
+def test_accepts_gzip(header, expected):
+    assert _accepts_gzip(header) is expected
+
+
+def test_prune_drops_timestamps_outside_window():
+    limiter = RateLimiter(max_requests=10, window_seconds=60)
+    limiter.requests['1.2.3.4'] = deque([0.0, 30.0, 61.0])
+
+    timestamps = limiter._prune('1.2.3.4', now=90.0)
+
+    assert list(timestamps) == [61.0]
+
+
+def test_prune_evicts_least_recently_seen_ip():
+    limiter = RateLimiter(max_requests=10, window_seconds=60, max_tracked_ips=2)
+    limiter._prune('a', now=0.0)
+    limiter._prune('b', now=0.0)
+    limiter._prune('a', now=1.0)  # 'b' is now the least recently seen
+
+    limiter._prune('c', now=2.0)
+
+    assert list(limiter.requests) == ['a', 'c']
+
+
+def test_sweep_forgets_only_idle_ips():
+    limiter = RateLimiter(max_requests=10, window_seconds=60)
+    limiter.requests['idle'] = deque([10.0])
+    limiter.requests['empty'] = deque()
+    limiter.requests['active'] = deque([10.0, 50.0])
+
+    limiter._sweep(now=100.0)
+
+    assert list(limiter.requests) == ['active']
+
+
+def test_rate_limit_applies_per_window():
+    limiter = RateLimiter(max_requests=2, window_seconds=60)
+
+    assert not limiter.is_rate_limited('1.2.3.4')
+    assert not limiter.is_rate_limited('1.2.3.4')
+    assert limiter.is_rate_limited('1.2.3.4')
+    assert not limiter.is_rate_limited('5.6.7.8')